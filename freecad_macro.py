@@ -1,18 +1,166 @@
 FONT_SIZE = 6
 
+# GUI 매크로로 실행할 때의 기본 입출력 경로 (배치 모드에서는 명령행 인자로 지정)
+INPUT_FILE = r"C:\tmp_freecad\ppt_freecad.txt"
+OUTPUT_FILE = r"C:\tmp_freecad\PPT_Model_with_text.FCStd"
+
+# 3D 뷰 테셀레이션 품질 ("fine": 작은 부품도 매끄럽게, "normal": 기본, "coarse": 큰 모델도 가볍게)
+# 객체마다 BoundBox 대각선 길이로 Deviation(%)/AngularDeflection(도)을 정함:
+# DISPLAY_REFERENCE_SIZE 이하의 객체는 단계의 기본값, 그보다 큰 객체는 크기의 로그에 비례해 거칠게 하며
+# FreeCAD 기본값(0.5%, 28.5도)보다 곱게 하지 않음 (큰 객체일수록 삼각형 수가 줄어듦)
+DISPLAY_QUALITY = "normal"
+DISPLAY_TESSELLATION = {
+    "fine": {"deviation": 0.2, "angular": 15.0},
+    "normal": {"deviation": 0.5, "angular": 28.5},
+    "coarse": {"deviation": 1.0, "angular": 40.0},
+}
+DISPLAY_REFERENCE_SIZE = 10.0  # mm
+FREECAD_DEFAULT_DEVIATION = 0.5  # %
+FREECAD_DEFAULT_ANGULAR = 28.5  # 도
+
+# True 이면 GUI 에서 계산을 Qt 이벤트 루프의 타이머로 한 단계(클러스터/D 바디 하나)씩 실행하며
+# 진행 대화상자(현재 작업, 남은 시간, 취소)를 표시하고 결과를 문서에 바로바로 추가
+GUI_PROGRESS = True
+
+# True 이면 GUI 매크로 실행 시 boolean 없이 P/D/N 프리미티브 compound 세 개만 바로 표시 (미리보기)
+# 층/위치 확인 후 False 로 바꿔 다시 실행하면 전체 fuse/cut 계산 (배치 모드에서는 --preview)
+PREVIEW_MODE = False
+PREVIEW_N_TRANSPARENCY = 70  # 미리보기에서 N compound 의 투명도 (0~100)
+
+# P/N 바디 합치기 방식
+#   "multi"    : OCC 다중 피연산자 fuse 한 번 (실패 시 "balanced" 로 대체)
+#   "balanced" : 쌍별 트리 축소 fuse
+#   "chain"    : 기존 순차 fuse (비교용)
+FUSE_STRATEGY = "multi"
+
+# True 이면 BoundBox 가 이어지는 바디끼리만 fuse 하고, 떨어진 그룹은 compound 로 묶음
+CLUSTERED_FUSION = True
+
+# True 이면 클러스터 안에서 같은 (z0, z_size) 층의 바디들은 밑면(2D)끼리 먼저 합치고 한 번만 돌출한 뒤,
+# 층별 판(slab) 솔리드만 3D fuse
+LAYER_UNION = True
+
+# True 이면 크기와 깊이가 같은 사각형/원기둥은 한 번만 만들고, 나머지는 토폴로지를 공유하는 인스턴스로 배치
+PRIMITIVE_INSTANCING = True
+
+# True 이면 P 클러스터마다 겹치는 N 바디와 함께 generalFuse 한 번으로 fuse/cut 하고, 그 이력(조각 -> 원본)으로
+# 결과의 각 면에 원본 P 프리미티브의 색상을 지정 (STL/3MF 에도 삼각형별 색상으로 반영).
+# False 이면 기존 fuse + cut 후 P_SUM 전체를 회색으로 표시
+P_FACE_COLORS = True
+P_DEFAULT_COLOR = (0.9, 0.9, 0.9)  # 원본을 찾지 못한 면, 그리고 P_FACE_COLORS = False 일 때의 색상
+
+# D 바디 cut 을 나눠 처리할 FreeCADCmd 워커 프로세스 수 (0 이면 현재 프로세스에서 순차 처리)
+D_CUT_WORKERS = 0
+# cut 이 필요한 D 바디가 이 개수 이상일 때만 워커 사용 (워커 시작 비용 때문)
+D_CUT_PARALLEL_MIN = 8
+# 워커들을 기다리는 최대 시간 (초). 넘으면 남은 워커를 종료하고 그 작업은 현재 프로세스에서 계산
+WORKER_TIMEOUT = 1800
+# STL/3MF 내보내기용 테셀레이션 설정 (MeshPart.meshFromShape)
+MESH_LINEAR_DEFLECTION = 0.1   # mm
+MESH_ANGULAR_DEFLECTION = 0.5  # rad
+# 테셀레이션을 나눠 처리할 FreeCADCmd 워커 수 (0 이면 현재 프로세스에서 순차 처리)
+MESH_WORKERS = 0
+# FreeCADCmd 실행 파일 경로 (None 이면 FreeCAD 설치 폴더의 bin 에서 찾음)
+FREECADCMD = None
+
+# 텍스트 표시 방식
+#   "shapestring" : 색상별로 모든 라벨의 글자 윤곽을 Part compound 하나로 만들고 색상을 한 번만 지정
+#   "draft"       : 라벨마다 Draft 텍스트 (색상별 그룹으로 묶음)
+# 글꼴 파일이 없거나 윤곽 생성에 실패하면 해당 색상 그룹은 "draft" 방식으로 대체
+TEXT_MODE = "shapestring"
+# ShapeString 글꼴 파일 (배치 모드에서는 --font). None 이면 Draft 환경설정의 ShapeString 글꼴,
+# 그다음 TEXT_FONT_CANDIDATES 중 처음 있는 파일을 사용
+TEXT_FONT_FILE = None
+TEXT_FONT_CANDIDATES = (
+    r"C:\Windows\Fonts\arial.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu-sans-fonts/DejaVuSans.ttf",
+    "/System/Library/Fonts/Supplemental/Arial.ttf",
+    "/Library/Fonts/Arial.ttf",
+)
+TEXT_FONT_NAME = "Arial"  # Draft 텍스트 글꼴 이름
+DRAFT_PARAMS = "User parameter:BaseApp/Preferences/Mod/Draft"
+
+# 텍스트 접두사 색상 (예: "r.U1" 은 빨강 "U1"). 접두사가 없으면 검정, 모르는 접두사는 빨강
+TEXT_COLOR_MAP = {
+    'b': (0.0, 0.0, 0.0),  # 검정
+    'w': (1.0, 1.0, 1.0),  # 흰색
+    'r': (1.0, 0.0, 0.0),  # 빨강
+    's': (0.0, 0.0, 1.0),  # 파랑
+    'y': (1.0, 1.0, 0.0),  # 노랑
+    'g': (0.0, 1.0, 0.0),  # 그린
+    'o': (1.0, 0.5, 0.0),  # 오렌지
+    'p': (0.5, 0.0, 0.5),  # 보라
+    'i': (0.0, 0.0, 0.5),  # 남색
+    'c': (0.0, 1.0, 1.0),  # 시안
+}
+
+# boolean 프로파일: 모든 fuse/cut 의 시간, 피연산자/결과 복잡도(면/모서리/솔리드 수), 실패를 기록하여
+# 출력 FCStd 옆에 <이름>_profile.json 으로 저장하고 가장 느린 PROFILE_TOP 개를 출력
+PROFILE_BOOLEANS = True
+PROFILE_SUFFIX = "_profile.json"
+PROFILE_TOP = 10
+
+# boolean 결과 BREP 캐시 (키: 피연산자 프리미티브 파라미터와 연산의 sha1)
+BREP_CACHE_ENABLED = True
+BREP_CACHE_DIR = None  # None 이면 임시 폴더의 ppt_freecad_cache
+BREP_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 초과 시 오래 사용하지 않은 파일부터 삭제
+BREP_CACHE_VERSION = 1  # 키 규칙이 바뀌면 올려서 기존 캐시를 무효화
+
 import FreeCAD, Part, Draft
-import FreeCADGui
+if FreeCAD.GuiUp:
+    import FreeCADGui
 import math
-import re
+import os
+import time
+import json
+import hashlib
+import shutil
+import subprocess
+import tempfile
+import argparse
+import traceback
+from collections import namedtuple
+import numpy as np
 
 import sys
 
-def focus_on_all_objects():
+# 같은 폴더의 보조 모듈(ppt_freecad_spatial.py, ppt_freecad_reader.py, ppt_freecad_mesh.py)을 찾을 수 있도록 매크로 폴더를 경로에 추가
+MACRO_DIR = os.path.dirname(os.path.abspath(__file__))
+if MACRO_DIR not in sys.path:
+    sys.path.insert(0, MACRO_DIR)
+from ppt_freecad_spatial import overlap_components, suggest_cell_size, UniformGrid
+from ppt_freecad_reader import read_primitives, format_errors
+from ppt_freecad_mesh import BinaryStlWriter, ThreeMFWriter
+
+# 추출기가 ppt_freecad.txt 옆에 저장하는 N/DP 겹침 맵 (sub_PPT_to_Freecad_macro_data.py 와 동일 규칙)
+OVERLAP_MAP_SUFFIX = "_overlap.json"
+
+# generate_bodies 가 만드는 프리미티브: 문서 객체 없이 Shape 와 색상, 원본 줄 번호, 캐시 키만 보관
+Primitive = namedtuple("Primitive", ["shape", "color", "line_number", "key"])
+
+# create_box / create_cylinder 의 원점 기준 프리미티브 캐시와 통계 (generate_bodies 시작 시 비움)
+PRIMITIVE_CACHE = {}
+PRIMITIVE_STATS = {"built": 0, "instanced": 0}
+
+# profile_boolean 이 기록하는 연산 목록 (main 시작 시 비움)
+BOOLEAN_PROFILE = []
+
+# 이 환경 변수에 작업 파일 경로가 있으면 매크로는 main 대신 cut 워커로 동작
+WORKER_JOB_ENV = "PPT_FREECAD_WORKER_JOB"
+WORKER_RESULT_ENV = "PPT_FREECAD_WORKER_RESULT"
+
+def focus_on_all_objects(doc=None):
     """
-    FreeCAD 문서 내 모든 객체를 화면에 표시.
+    FreeCAD 문서(doc, 없으면 활성 문서) 내 모든 객체를 화면에 표시.
     """
+    if not FreeCAD.GuiUp:
+        return
     try:
-        view = FreeCADGui.ActiveDocument.ActiveView  # 활성화된 뷰 가져오기
+        gui_doc = FreeCADGui.getDocument(doc.Name) if doc else FreeCADGui.ActiveDocument
+        view = gui_doc.ActiveView  # 활성화된 뷰 가져오기
         view.fitAll()  # 모든 객체를 화면에 맞추기
         print("View adjusted to fit all objects.")
     except Exception as e:
@@ -30,6 +178,8 @@ def wait_for_user():
     """
     사용자 입력 대기 대신 FreeCAD의 이벤트 루프를 강제로 실행하여 대기.
     """
+    if not FreeCAD.GuiUp:
+        return
     print("Bodies are displayed in the FreeCAD GUI. Close the message box to continue...")
     from PySide2.QtWidgets import QMessageBox
     box = QMessageBox()
@@ -38,18 +188,18 @@ def wait_for_user():
     box.exec_()
 
 
-def clean_line(line):
-    """
-    대괄호 안의 쉼표는 분리 기준에서 제외하고, 각 필드를 정리하여 반환.
-    """
-    fields = re.findall(r'\[[^\]]+\]|[^,\t]+', line)
-    cleaned_parts = [field.strip() for field in fields]
-    return ", ".join(cleaned_parts)
-
 def create_box(center_x, center_y, x_size, y_size, z_start, depth, rotation=0):
     """
     사각형(RECTANGLE) 바디를 생성하여 반환.
+    PRIMITIVE_INSTANCING 이면 같은 (x_size, y_size, depth) 의 원점 기준 솔리드를 한 번만 만들고 Placement 로 배치.
     """
+    if PRIMITIVE_INSTANCING:
+        base = primitive_base(("RECTANGLE", x_size, y_size, depth),
+                              lambda: build_box(0, 0, x_size, y_size, 0, depth))
+        return primitive_instance(base, center_x, center_y, z_start, rotation)
+    return build_box(center_x, center_y, x_size, y_size, z_start, depth, rotation)
+
+def build_box(center_x, center_y, x_size, y_size, z_start, depth, rotation=0):
     half_x = x_size / 2
     half_y = y_size / 2
     p1 = FreeCAD.Vector(-half_x, -half_y, 0)
@@ -67,11 +217,35 @@ def create_box(center_x, center_y, x_size, y_size, z_start, depth, rotation=0):
 
 def create_cylinder(center_x, center_y, radius, z_start, height):
     """
-    원(CIRCLE) 바디를 생성하여 반환.
+    원(CIRCLE) 바디를 생성하여 반환. PRIMITIVE_INSTANCING 이면 같은 (radius, height) 는 한 번만 생성.
     """
+    if PRIMITIVE_INSTANCING:
+        base = primitive_base(("CIRCLE", radius, height), lambda: Part.makeCylinder(radius, height))
+        return primitive_instance(base, center_x, center_y, z_start)
     cylinder = Part.makeCylinder(radius, height, FreeCAD.Vector(center_x, center_y, z_start))
     return cylinder
 
+def primitive_base(key, build):
+    """
+    (도형 종류, 크기, 깊이) 키의 원점 기준 솔리드를 PRIMITIVE_CACHE 에서 찾고, 없으면 build() 로 한 번만 생성.
+    """
+    base = PRIMITIVE_CACHE.get(key)
+    if base is None:
+        base = PRIMITIVE_CACHE[key] = build()
+        PRIMITIVE_STATS["built"] += 1
+    else:
+        PRIMITIVE_STATS["instanced"] += 1
+    return base
+
+def primitive_instance(base, center_x, center_y, z_start, rotation=0):
+    """
+    base 의 토폴로지를 공유하고 위치(Placement)만 다른 Shape 를 반환.
+    """
+    instance = Part.Shape(base)
+    instance.Placement = FreeCAD.Placement(FreeCAD.Vector(center_x, center_y, z_start),
+                                           FreeCAD.Rotation(FreeCAD.Vector(0, 0, 1), rotation))
+    return instance
+
 def debug_body(body, label):
     """
     바디의 BoundBox 정보를 출력하여 디버깅.
@@ -87,342 +261,1375 @@ def debug_body(body, label):
 def add_text_to_plane(text, position, height=FONT_SIZE, z_position=40, color=(1.0, 0.0, 0.0)):
     """
     Adds text to a specified position in the FreeCAD document with specified color and font size.
+    color 가 None 이면 뷰 속성을 지정하지 않고 Draft 환경설정의 기본값을 그대로 사용.
     """
     # 텍스트 객체 생성
     text_shape = Draft.make_text(text, FreeCAD.Vector(position[0], position[1], z_position))
     text_shape.Label = f"Text_{text}"  # 객체 라벨 설정
+    if text_shape.ViewObject is None or color is None:  # FreeCADCmd 배치 모드에는 뷰 속성이 없음
+        return text_shape
     text_shape.ViewObject.FontSize = height  # 폰트 크기 설정
-    text_shape.ViewObject.FontName = "Arial"  # 기본 폰트 설정
+    text_shape.ViewObject.FontName = TEXT_FONT_NAME  # 기본 폰트 설정
     text_shape.ViewObject.TextColor = color  # 텍스트 색상 설정
     return text_shape
 
-def parse_color(color_str):
+def split_text_color(text):
     """
-    색상 문자열을 파싱하여 (R, G, B) 튜플을 반환. (0~1 범위)
+    "접두사.내용" 형식의 텍스트를 (내용, 색상) 으로 분리.
     """
-    if "ThemeColor" in color_str:
-        # ThemeColor를 특정 색상으로 매핑. 필요에 따라 변경 가능.
-        return (0.0, 1.0, 0.0)  # 녹색
-    numbers = re.findall(r'\d+', color_str)
-    if len(numbers) >= 3:
-        return tuple(map(lambda x: int(x) / 255.0, numbers[:3]))
-    else:
-        return (1.0, 1.0, 1.0)  # 기본 색상: 흰색
+    if '.' in text:
+        prefix, content = text.split('.', 1)
+        return content, TEXT_COLOR_MAP.get(prefix.lower(), (1.0, 0.0, 0.0))  # 기본값: 빨강
+    return text, (0.0, 0.0, 0.0)  # 기본값: 검정
+
+def text_label_position(content, x, y, z):
+    """
+    라벨 중심 좌표에서 텍스트 시작 위치를 계산 (Draft 텍스트와 ShapeString 공통).
+    """
+    return (x - FONT_SIZE * (len(content) / 20), y - FONT_SIZE / 3, z + 0.5)
+
+def find_font_file():
+    """
+    ShapeString 에 쓸 글꼴 파일 경로를 반환 (없으면 None).
+    TEXT_FONT_FILE, Draft 환경설정의 ShapeString 글꼴, TEXT_FONT_CANDIDATES 순서로 찾음.
+    """
+    if TEXT_FONT_FILE:
+        return TEXT_FONT_FILE if os.path.isfile(TEXT_FONT_FILE) else None
+    candidates = [FreeCAD.ParamGet(DRAFT_PARAMS).GetString("FontFile", "")] + list(TEXT_FONT_CANDIDATES)
+    return next((path for path in candidates if path and os.path.isfile(path)), None)
+
+def make_text_shape(content, position, font_file, height=FONT_SIZE):
+    """
+    font_file 글꼴로 텍스트 윤곽을 만들어 position 으로 옮긴 compound 를 반환 (문서 객체 없음).
+    글자별로 면을 만들고, 면을 만들 수 없는 글자는 윤곽선만 사용.
+    """
+    shapes = []
+    for char_wires in Part.makeWireString(content, font_file, height):
+        if not char_wires:
+            continue  # 공백 문자
+        try:
+            shapes.append(Part.makeFace(char_wires, "Part::FaceMakerBullseye"))
+        except Exception:
+            shapes.extend(char_wires)
+    text_shape = Part.makeCompound(shapes)
+    text_shape.translate(FreeCAD.Vector(*position))
+    return text_shape
+
+def add_text_group(doc, labels, color, name, font_file):
+    """
+    같은 색상의 라벨들 [(내용, 위치)] 을 ShapeString compound 하나의 Part::Feature 로 doc 에 추가.
+    색상은 그룹마다 한 번만 지정.
+    """
+    text_shape = Part.makeCompound([make_text_shape(content, position, font_file) for content, position in labels])
+    obj = doc.addObject("Part::Feature", name)
+    obj.Shape = text_shape
+    obj.Label = name
+    apply_display_tessellation(obj)
+    if obj.ViewObject is not None:  # FreeCADCmd 배치 모드에는 뷰 속성이 없음
+        obj.ViewObject.ShapeColor = color
+        obj.ViewObject.LineColor = color
+    return obj
+
+def set_draft_text_defaults(height, color):
+    """
+    Draft 환경설정의 새 텍스트 기본값(글자 크기, 글꼴, 색상)을 지정하고, 이전 설정으로 되돌리는 함수를 반환.
+    """
+    params = FreeCAD.ParamGet(DRAFT_PARAMS)
+    r, g, b = (min(255, max(0, int(round(channel * 255)))) for channel in color)
+    values = (("Float", "textheight", float(height)), ("String", "textfont", TEXT_FONT_NAME),
+              ("Unsigned", "DefaultTextColor", (r << 24) | (g << 16) | (b << 8) | 255))
+    saved = []
+    for kind, key, value in values:
+        existing = getattr(params, f"Get{kind}s")()
+        saved.append((kind, key, getattr(params, f"Get{kind}")(key) if key in existing else None))
+        getattr(params, f"Set{kind}")(key, value)
+
+    def restore():
+        for kind, key, value in saved:
+            if value is None:
+                getattr(params, f"Remove{kind}")(key)
+            else:
+                getattr(params, f"Set{kind}")(key, value)
+    return restore
+
+def add_draft_text_group(doc, labels, color, name):
+    """
+    같은 색상의 라벨들을 각각 Draft 텍스트로 만들어 doc 의 색상별 그룹 하나에 담음.
+    글자 크기, 글꼴, 색상은 그룹마다 Draft 텍스트 기본값으로 한 번만 지정하며,
+    기본값을 따르지 않는 Draft 버전에서만 라벨마다 뷰 속성을 지정.
+    """
+    # Draft.make_text 는 활성 문서에 만들므로, 사용자가 다른 문서로 바꿨어도 doc 에 만들어지도록 지정
+    FreeCAD.setActiveDocument(doc.Name)
+    group = doc.addObject("App::DocumentObjectGroup", name)
+    restore = set_draft_text_defaults(FONT_SIZE, color) if FreeCAD.GuiUp else None
+    try:
+        texts = [add_text_to_plane(text=content, position=(x, y), z_position=z, height=FONT_SIZE, color=None)
+                 for content, (x, y, z) in labels]
+    finally:
+        if restore:
+            restore()
+    view = texts[0].ViewObject if texts else None
+    applied = (float(view.FontSize), *view.TextColor[:3]) if view is not None else None
+    if applied and any(abs(a - b) > 1e-3 for a, b in zip(applied, (FONT_SIZE, *color))):
+        for text_obj in texts:
+            text_obj.ViewObject.FontSize = FONT_SIZE
+            text_obj.ViewObject.FontName = TEXT_FONT_NAME
+            text_obj.ViewObject.TextColor = color
+    group.addObjects(texts)
+    return group
+
+def add_texts(doc, text_positions):
+    """
+    라벨들을 색상별로 묶어 TEXT_MODE 방식으로 doc 에 추가.
+    """
+    groups = {}
+    for text, (x, y, z) in text_positions:
+        content, color = split_text_color(text)
+        groups.setdefault(color, []).append((content, text_label_position(content, x, y, z)))
+
+    use_shapestring = TEXT_MODE == "shapestring"
+    font_file = find_font_file() if use_shapestring else None
+    if use_shapestring and not font_file:
+        print(f"Font file {TEXT_FONT_FILE or 'for ShapeStrings'} not found. Using Draft texts.")
+        use_shapestring = False
+
+    for i, (color, labels) in enumerate(groups.items()):
+        name = f"Texts_{i + 1}"
+        if use_shapestring:
+            try:
+                add_text_group(doc, labels, color, name, font_file)
+                print(f"Added {len(labels)} labels with color {color} as {name}.")
+                continue
+            except Exception as e:
+                print(f"Error creating ShapeStrings for {name}: {e}. Using Draft texts.")
+        add_draft_text_group(doc, labels, color, name)
+        print(f"Added {len(labels)} Draft texts with color {color} in {name}.")
 
 def apply_color_to_body(obj, color):
     """
-    주어진 객체에 색상을 적용.
+    주어진 객체에 색상을 적용. (FreeCADCmd 배치 모드처럼 ViewObject 가 없으면 생략)
     """
+    if obj.ViewObject is None:
+        return
     scaled_color = color  # 이미 0~1 범위로 가정
     obj.ViewObject.ShapeColor = scaled_color
     face_colors = [scaled_color for _ in obj.Shape.Faces]
     obj.ViewObject.DiffuseColor = face_colors
     print(f"Applied color {scaled_color} to {len(obj.Shape.Faces)} faces.")
 
-def are_bounding_boxes_intersecting(bbox1, bbox2):
+def apply_face_colors(obj, face_colors):
+    """
+    객체의 면별 색상(DiffuseColor)을 지정. face_colors 는 obj.Shape.Faces 순서의 (R, G, B) 리스트.
+    """
+    if obj.ViewObject is None:
+        return
+    obj.ViewObject.DiffuseColor = face_colors
+    print(f"Applied {len(set(face_colors))} source colors to {len(face_colors)} faces.")
+
+def display_tessellation(shape, quality=None):
     """
-    두 BoundBox가 겹치는지 확인.
-    bbox1, bbox2는 FreeCAD.Base.BoundBox 객체.
-    모든 축에서 겹치면 True, 아니면 False.
+    Shape 크기와 품질 단계로 (Deviation %, AngularDeflection 도) 를 계산.
     """
-    overlap_x = bbox1.XMin <= bbox2.XMax and bbox1.XMax >= bbox2.XMin
-    overlap_y = bbox1.YMin <= bbox2.YMax and bbox1.YMax >= bbox2.YMin
-    overlap_z = bbox1.ZMin <= bbox2.ZMax and bbox1.ZMax >= bbox2.ZMin
-    return overlap_x and overlap_y and overlap_z
+    settings = DISPLAY_TESSELLATION[quality or DISPLAY_QUALITY]
+    diagonal = shape.BoundBox.DiagonalLength
+    if diagonal <= DISPLAY_REFERENCE_SIZE:
+        return settings["deviation"], settings["angular"]
+    growth = 1 + math.log10(diagonal / DISPLAY_REFERENCE_SIZE) / 2
+    deviation = min(10.0, max(FREECAD_DEFAULT_DEVIATION, settings["deviation"] * growth))
+    angular = min(60.0, max(FREECAD_DEFAULT_ANGULAR, settings["angular"] * growth))
+    return deviation, angular
+
+def apply_display_tessellation(obj):
+    """
+    객체의 뷰 테셀레이션(Deviation, AngularDeflection)을 크기에 맞게 지정. (ViewObject 가 없으면 생략)
+    """
+    if obj.ViewObject is None or not hasattr(obj.ViewObject, "Deviation"):
+        return
+    deviation, angular = display_tessellation(obj.Shape)
+    obj.ViewObject.Deviation = deviation
+    obj.ViewObject.AngularDeflection = angular
+
+def show_shape(doc, shape, label, color):
+    """
+    최종 결과 Shape 를 Part::Feature 로 doc 에 추가하고 색상을 적용.
+    Part.show 와 달리 recompute 하지 않으므로 main 끝에서 한 번만 recompute.
+    """
+    obj = doc.addObject("Part::Feature", label)
+    obj.Shape = shape
+    obj.Label = label
+    apply_display_tessellation(obj)
+    apply_color_to_body(obj, color)
+    return obj
+
+def bound_box_tuple(shape):
+    """
+    Shape 의 BoundBox 를 (XMin, XMax, YMin, YMax, ZMin, ZMax) 튜플로 반환.
+    """
+    bbox = shape.BoundBox
+    return (bbox.XMin, bbox.XMax, bbox.YMin, bbox.YMax, bbox.ZMin, bbox.ZMax)
+
+def cache_key(*parts):
+    """
+    프리미티브 파라미터 또는 (연산, 피연산자 키들)로부터 내용 기반 캐시 키(sha1)를 생성.
+    """
+    return hashlib.sha1(repr((BREP_CACHE_VERSION,) + parts).encode("utf-8")).hexdigest()
+
+def cache_dir():
+    return BREP_CACHE_DIR or os.path.join(tempfile.gettempdir(), "ppt_freecad_cache")
+
+def cache_path(key):
+    return os.path.join(cache_dir(), key + ".brep")
+
+def cache_load(key):
+    """
+    캐시에 key 의 BREP 이 있으면 Shape 로 읽어 반환 (없으면 None). 읽은 파일은 사용 시각을 갱신 (LRU).
+    """
+    if not BREP_CACHE_ENABLED or key is None:
+        return None
+    path = cache_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        shape = Part.Shape()
+        shape.importBrep(path)
+        os.utime(path)
+        return shape
+    except Exception as e:
+        print(f"Error reading cached BREP {path}: {e}")
+        return None
+
+def cache_temp_path(key):
+    """
+    캐시 폴더에 key 용 고유 임시 파일을 만들어 경로를 반환. 같은 key 를 동시에 저장하는 배치 실행끼리
+    임시 파일을 공유하지 않으므로, os.replace 로 교체되는 파일은 항상 한 실행이 끝까지 쓴 파일.
+    """
+    os.makedirs(cache_dir(), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=key + ".", suffix=".tmp", dir=cache_dir())
+    os.close(fd)
+    return temp_path
+
+def cache_store(key, shape):
+    """
+    boolean 결과를 key 의 BREP 파일로 저장 (임시 파일에 쓴 뒤 교체).
+    """
+    if not BREP_CACHE_ENABLED or key is None or shape is None or shape.isNull():
+        return
+    temp_path = None
+    try:
+        temp_path = cache_temp_path(key)
+        shape.exportBrep(temp_path)
+        os.replace(temp_path, cache_path(key))
+    except Exception as e:
+        print(f"Error writing cached BREP for {key}: {e}")
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def cache_load_colors(key):
+    """
+    cache_store_colors 로 저장한 면 색상 리스트를 읽어 반환 (없으면 None).
+    """
+    if not BREP_CACHE_ENABLED or key is None:
+        return None
+    path = os.path.join(cache_dir(), key + ".colors.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            face_colors = [tuple(color) for color in json.load(f)]
+        os.utime(path)
+        return face_colors
+    except (OSError, ValueError):
+        return None
+
+def cache_store_colors(key, face_colors):
+    """
+    key 의 BREP 과 짝을 이루는 면 색상 리스트를 JSON 으로 저장.
+    """
+    if not BREP_CACHE_ENABLED or key is None:
+        return
+    temp_path = None
+    try:
+        temp_path = cache_temp_path(key)
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump([list(color) for color in face_colors], f)
+        os.replace(temp_path, os.path.join(cache_dir(), key + ".colors.json"))
+    except OSError as e:
+        print(f"Error writing cached face colors for {key}: {e}")
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def evict_cache():
+    """
+    캐시 폴더 크기가 BREP_CACHE_MAX_BYTES 를 넘으면 가장 오래 사용하지 않은 파일부터 삭제.
+    """
+    if not BREP_CACHE_ENABLED or not os.path.isdir(cache_dir()):
+        return
+    entries = []
+    for entry in os.scandir(cache_dir()):
+        if entry.is_file() and entry.name.endswith((".brep", ".colors.json")):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= BREP_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            removed += 1
+        except OSError as e:
+            print(f"Error removing cached BREP {path}: {e}")
+    if removed:
+        print(f"Evicted {removed} cached BREP files ({total / 1e6:.1f} MB left).")
+
+def shape_stats(shape):
+    """
+    Shape 의 면/모서리/솔리드 수.
+    """
+    return {"faces": len(shape.Faces), "edges": len(shape.Edges), "solids": len(shape.Solids)}
+
+def profile_boolean(operation, label, operands, lines, compute):
+    """
+    compute() 로 boolean 연산을 실행하며 시간, 피연산자와 결과의 복잡도, null 결과/오류를 BOOLEAN_PROFILE 에 기록.
+    lines 는 피연산자 프리미티브의 원본 줄 번호. 오류는 기록한 뒤 다시 발생시킴.
+    """
+    if not PROFILE_BOOLEANS:
+        return compute()
+    operand_stats = [shape_stats(shape) for shape in operands]
+    entry = {
+        "operation": operation,
+        "label": label,
+        "lines": sorted(lines),
+        "operands": len(operands),
+        "operand_faces": sum(stats["faces"] for stats in operand_stats),
+        "operand_edges": sum(stats["edges"] for stats in operand_stats),
+        "operand_solids": sum(stats["solids"] for stats in operand_stats),
+    }
+    start = time.perf_counter()
+    try:
+        result = compute()
+    except Exception as e:
+        entry.update(seconds=time.perf_counter() - start, status="error", error=str(e))
+        BOOLEAN_PROFILE.append(entry)
+        raise
+    entry["seconds"] = time.perf_counter() - start
+    if result is None or result.isNull():
+        entry["status"] = "null"
+    else:
+        entry["status"] = "ok"
+        entry["result"] = shape_stats(result)
+    BOOLEAN_PROFILE.append(entry)
+    return result
+
+def save_profile_report(report_file):
+    """
+    BOOLEAN_PROFILE 을 JSON 으로 저장하고 가장 느린 PROFILE_TOP 개의 연산을 출력.
+    """
+    if not PROFILE_BOOLEANS or not BOOLEAN_PROFILE:
+        return
+    slowest = sorted(BOOLEAN_PROFILE, key=lambda entry: entry["seconds"], reverse=True)[:PROFILE_TOP]
+    report = {
+        "operations": BOOLEAN_PROFILE,
+        "total_seconds": sum(entry["seconds"] for entry in BOOLEAN_PROFILE),
+        "failures": sum(1 for entry in BOOLEAN_PROFILE if entry["status"] != "ok"),
+    }
+    try:
+        with open(report_file, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved boolean profile to {report_file}")
+    except OSError as e:
+        print(f"Error writing boolean profile {report_file}: {e}")
+
+    print(f"=== Slowest boolean operations ({len(BOOLEAN_PROFILE)} total, "
+          f"{report['total_seconds']:.2f} s, {report['failures']} failed or null) ===")
+    for entry in slowest:
+        print(f"{entry['seconds']:8.2f} s  {entry['operation']:6s} {entry['label']:20s} "
+              f"{entry['operands']} operands, {entry['operand_faces']} faces -> "
+              f"{entry.get('result', {}).get('faces', '-')} faces [{entry['status']}]  lines {entry['lines']}")
+
+def load_overlap_map(input_file):
+    """
+    input_file 옆의 겹침 맵을 읽어 {D/P 줄 번호: [N 줄 번호, ...]} 를 반환.
+    맵이 없거나 txt 가 맵 생성 이후 수정되었으면 None 을 반환.
+    """
+    map_file = os.path.splitext(input_file)[0] + OVERLAP_MAP_SUFFIX
+    if not os.path.exists(map_file):
+        print(f"Overlap map not found: {map_file}. Using the bounding-box index for every cut.")
+        return None
+    try:
+        with open(map_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        with open(input_file, "rb") as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+    except (OSError, ValueError) as e:
+        print(f"Error reading overlap map {map_file}: {e}")
+        return None
+    if data.get("sha1") != digest:
+        print(f"Overlap map {map_file} is out of date. Using the bounding-box index for every cut.")
+        return None
+    overlap_map = {int(line_number): n_lines for line_number, n_lines in data["overlaps"].items()}
+    print(f"Loaded overlap map for {len(overlap_map)} D/P bodies.")
+    return overlap_map
+
+def build_N_index(N_bodies):
+    """
+    N 바디 BoundBox 의 균일 격자 인덱스를 생성 (키: N_bodies 내 인덱스).
+    """
+    boxes = [bound_box_tuple(N_entry.shape) for N_entry in N_bodies]
+    N_index = UniformGrid(suggest_cell_size(boxes))
+    for i, box in enumerate(boxes):
+        N_index.insert(i, box)
+    return N_index
+
+def select_N_bodies(N_bodies, N_index, overlap_map, entries):
+    """
+    entries(P/D Primitive)와 겹치는 N 바디만 골라 반환.
+    겹침 맵에 모든 줄 번호가 있으면 맵을, 아니면 BoundBox 격자 인덱스를 사용.
+    """
+    if overlap_map is not None and all(entry.line_number in overlap_map for entry in entries):
+        relevant_lines = set()
+        for entry in entries:
+            relevant_lines.update(overlap_map[entry.line_number])
+        return [N_entry for N_entry in N_bodies if N_entry.line_number in relevant_lines]
+
+    relevant = set()
+    for entry in entries:
+        relevant.update(N_index.query(bound_box_tuple(entry.shape)))
+    return [N_bodies[i] for i in sorted(relevant)]
 
 def generate_bodies(input_file):
     """
     Reads the input file and creates P-body, D-body, N-body geometries.
-    Applies colors and text annotations, and displays the objects in the FreeCAD GUI.
+    문서 객체는 만들지 않고 Primitive(Shape, 색상, 줄 번호) 리스트와 텍스트 위치만 반환.
+    파일은 ppt_freecad_reader 로 한 번에 읽고 검증하며, 오류가 있는 줄은 모두 보고한 뒤 제외.
     """
-    P_bodies = []
-    D_bodies = []
-    N_bodies = []
+    start = time.perf_counter()
+    bodies = {"P": [], "D": [], "N": []}
     text_positions = []
+    PRIMITIVE_CACHE.clear()
+    PRIMITIVE_STATS.update(built=0, instanced=0)
 
-    with open(input_file, "r", encoding="utf-8") as f:
-        for line_number, line in enumerate(f, 1):
-            cleaned_line = clean_line(line)
-            if not cleaned_line.strip():
-                continue
+    table = read_primitives(input_file)
+    if table.errors:
+        print(f"{len(table.errors)} invalid lines skipped in {input_file}:")
+        print(format_errors(table.errors))
+    if table.warnings:
+        print(f"{len(table.warnings)} lines with warnings in {input_file}:")
+        print(format_errors(table.warnings))
 
-            parts = cleaned_line.strip().split(", ")
-            if len(parts) < 4:
-                print(f"Skipping malformed line {line_number}: {cleaned_line}")
-                continue
+    # RECTANGLE 처리
+    rect = table.columns["RECTANGLE"]
+    for line_number, body_type, center_x, center_y, x_size, y_size, z_start, depth, rotation, color, text in zip(
+            rect["line_number"].tolist(), rect["body_type"].tolist(), rect["center_x"].tolist(),
+            rect["center_y"].tolist(), rect["x_size"].tolist(), rect["y_size"].tolist(),
+            rect["z_start"].tolist(), rect["depth"].tolist(), rect["angle"].tolist(),
+            rect["color"].tolist(), rect["label"].tolist()):
+        body = create_box(center_x, center_y, x_size, y_size, z_start, depth, rotation)
+        key = cache_key("RECTANGLE", center_x, center_y, x_size, y_size, z_start, depth, rotation)
+        bodies[body_type].append(Primitive(body, tuple(color), line_number, key))
+        if text:
+            text_positions.append((line_number, text, (center_x - 5 * 2 / 3 * len(text) / 2, center_y, z_start + depth)))
 
-            body_type = parts[0].upper()
-            shape_type = parts[3].upper()
-
-            # RECTANGLE 처리
-            if shape_type == "RECTANGLE":
-                try:
-                    center_x = float(parts[4])
-                    center_y = float(parts[5])
-                    x_size = float(parts[6])
-                    y_size = float(parts[7])
-                    z_start = float(parts[1])
-                    depth = float(parts[2])
-                    rotation = float(parts[8]) if len(parts) > 8 else 0
-                    body = create_box(center_x, center_y, x_size, y_size, z_start, depth, rotation)
-
-                    if len(parts) == 11:
-                        text = parts[10].strip('"')
-                        text_z = z_start + depth
-                        text_positions.append((text, (center_x-5*2/3*len(text)/2, center_y, text_z)))
-
-                except (ValueError, IndexError) as e:
-                    print(f"Error parsing RECTANGLE line {line_number}: {cleaned_line} - {e}")
-                    continue
-
-            # CIRCLE 처리
-            elif shape_type == "CIRCLE":
-                try:
-                    center_x = float(parts[4])
-                    center_y = float(parts[5])
-                    radius = float(parts[6])
-                    z_start = float(parts[1])
-                    height = float(parts[2])
-                    body = create_cylinder(center_x, center_y, radius, z_start, height)
-
-                    if len(parts) == 9:
-                        text = parts[8].strip('"')
-                        text_z = z_start + height
-                        text_positions.append((text, (center_x, center_y, text_z)))
-
-                except (ValueError, IndexError) as e:
-                    print(f"Error parsing CIRCLE line {line_number}: {cleaned_line} - {e}")
-                    continue
+    # CIRCLE 처리
+    circle = table.columns["CIRCLE"]
+    for line_number, body_type, center_x, center_y, radius, z_start, height, color, text in zip(
+            circle["line_number"].tolist(), circle["body_type"].tolist(), circle["center_x"].tolist(),
+            circle["center_y"].tolist(), circle["radius"].tolist(), circle["z_start"].tolist(),
+            circle["depth"].tolist(), circle["color"].tolist(), circle["label"].tolist()):
+        body = create_cylinder(center_x, center_y, radius, z_start, height)
+        key = cache_key("CIRCLE", center_x, center_y, radius, z_start, height)
+        bodies[body_type].append(Primitive(body, tuple(color), line_number, key))
+        if text:
+            text_positions.append((line_number, text, (center_x, center_y, z_start + height)))
 
-            else:
-                print(f"Unknown shape type on line {line_number}: {shape_type}")
-                continue
+    # 도형 종류별로 읽었으므로 파일 순서(줄 번호)로 되돌림
+    P_bodies, D_bodies, N_bodies = (sorted(bodies[body_type], key=lambda entry: entry.line_number)
+                                    for body_type in ("P", "D", "N"))
+    text_positions = [(text, position) for _, text, position in sorted(text_positions)]
 
-            # 색상 처리
-            color = parse_color(parts[9 if shape_type == "RECTANGLE" else 7])
-
-            # P 바디 처리
-            if body_type == "P":
-                print(f"Processing P-body on line {line_number}")
-                obj = Part.show(body)
-                apply_color_to_body(obj, color)
-                P_bodies.append((body, obj, color))
-                # 객체 삭제
-                FreeCAD.ActiveDocument.removeObject(obj.Name)
-
-            # D 바디 처리
-            elif body_type == "D":
-                print(f"Processing D-body on line {line_number}")
-                obj = Part.show(body)
-                apply_color_to_body(obj, color)
-                D_bodies.append((body, obj, color))
-                # 객체 삭제
-                FreeCAD.ActiveDocument.removeObject(obj.Name)
-
-            # N 바디 처리
-            elif body_type == "N":
-                print(f"Processing N-body on line {line_number}")
-                obj = Part.show(body)
-                apply_color_to_body(obj, color)
-                N_bodies.append((body, obj, color))
-                # 객체 삭제
-                FreeCAD.ActiveDocument.removeObject(obj.Name)
-
-    # 상세 로그 출력
+    # 요약 로그 출력
     print("=== Body generation completed ===")
-    for i, (body, obj, color) in enumerate(P_bodies):
-        print(f"P Body {i + 1}: Color={color}")
-    for i, (body, obj, color) in enumerate(D_bodies):
-        print(f"D Body {i + 1}: Color={color}")
-    for i, (body, obj, color) in enumerate(N_bodies):
-        print(f"N Body {i + 1}: Color={color}")
+    print(f"P bodies: {len(P_bodies)}, D bodies: {len(D_bodies)}, N bodies: {len(N_bodies)} "
+          f"({time.perf_counter() - start:.2f} s)")
+    if PRIMITIVE_INSTANCING:
+        print(f"Built {PRIMITIVE_STATS['built']} distinct primitives, "
+              f"{PRIMITIVE_STATS['instanced']} bodies reuse them as placed instances.")
 
     return P_bodies, D_bodies, N_bodies, text_positions
 
 
-def D_body_sub_N_body(D_body, N_SUM, D_color):
+def cut_D_body(D_body, N_tools, label, lines=()):
     """
-    Subtract N_SUM from a single D body.
+    Subtract the intersecting N bodies (N_tools) from a single D body.
+    N_tools 가 비어 있으면 boolean 없이, 결과가 null 이거나 오류가 나면 원본 D 바디를 반환.
+    lines 는 프로파일에 기록할 D 와 N 프리미티브의 원본 줄 번호.
     """
-    print("Processing a single D body...")
-    try:
-        if not are_bounding_boxes_intersecting(D_body.BoundBox, N_SUM.BoundBox):
-            print("D body does not intersect with N_SUM. Skipping.")
-            return D_body, None
-
-        updated_body = D_body.cut(N_SUM)
-        if updated_body.isNull():
-            print("D body - N_SUM resulted in a null body. Skipping.")
-            return None, None
+    updated_body = D_body
+    if N_tools:
+        try:
+            print(f"Processing {label} - Subtracting {len(N_tools)} intersecting N bodies...")
+            result = profile_boolean("cut", label, [D_body] + N_tools, lines,
+                                     lambda: D_body.cut(N_tools[0] if len(N_tools) == 1 else N_tools))
+            if result.isNull():
+                print(f"{label} - N resulted in a null body. Showing original D_body.")
+            else:
+                updated_body = result
+        except Exception as e:
+            print(f"Error processing {label}: {e}")
+            print(f"Showing original {label}.")
+    else:
+        print(f"{label} does not intersect any N body. Skipping cut.")
+    return updated_body
 
-        new_obj = Part.show(updated_body)
-        apply_color_to_body(new_obj, D_color)
+def show_D_body(doc, updated_body, D_color, label):
+    """
+    cut 이 끝난 D 바디를 doc 에 표시하고 색상을 적용.
+    """
+    try:
+        new_obj = show_shape(doc, updated_body, label, D_color)
+        debug_body(updated_body, label)
         return updated_body, new_obj
-
     except Exception as e:
-        print(f"Error processing D body: {e}")
+        print(f"Error showing {label}: {e}")
         return None, None
 
-def fuse_P_bodies(P_bodies):
+def iter_D_cuts(cut_jobs, cut_keys):
     """
-    Fuse all P bodies into a single body (P_SUM).
+    (D_body, N_tools, label, lines) 작업들의 cut 결과를 같은 순서로 하나씩 돌려주는 generator.
+    캐시에 있는 결과는 BREP 으로 읽고, 나머지만 계산한 뒤 캐시에 저장.
+    워커를 쓰는 경우 첫 결과를 요청할 때 모든 작업을 워커들에서 한 번에 계산하고,
+    아니면 결과를 요청할 때마다 하나씩 현재 프로세스에서 계산.
     """
-    print("Fusing P bodies into P_SUM...")
-    P_SUM = None
-    for i, (P_body, _, _) in enumerate(P_bodies):  # 튜플 형태에서 P_body를 언팩
-        print(f"Fusing P body {i + 1} into P_SUM...")
-        if P_SUM is None:
-            P_SUM = P_body
-        else:
-            P_SUM = P_SUM.fuse(P_body)
-    if P_SUM:
-        debug_body(P_SUM, "P_SUM")
+    updated_bodies = [cache_load(key) for key in cut_keys]
+    missing = [i for i, updated_body in enumerate(updated_bodies) if updated_body is None]
+    if len(missing) < len(cut_jobs):
+        print(f"Loaded {len(cut_jobs) - len(missing)} D body cuts from the BREP cache.")
+
+    missing_jobs = [cut_jobs[i] for i in missing]
+    if D_CUT_WORKERS > 0 and sum(1 for _, N_tools, _, _ in missing_jobs if N_tools) >= D_CUT_PARALLEL_MIN:
+        computed = dict(zip(missing, cut_D_bodies_parallel(missing_jobs, D_CUT_WORKERS)))
     else:
-        print("No P bodies found.")
-    return P_SUM
-
-def fuse_N_bodies(N_bodies):
-    print("Fusing N bodies into N_SUM...")
-    N_SUM = None
-    for i, (N_body, _, _) in enumerate(N_bodies):
-        print(f"Fusing N body {i + 1} into N_SUM...")
-        if N_SUM is None:
-            N_SUM = N_body
+        computed = {}
+
+    for i, updated_body in enumerate(updated_bodies):
+        if updated_body is None:
+            updated_body = computed[i] if i in computed else cut_D_body(*cut_jobs[i])
+            # 원본이 그대로 돌아온 경우(cut 생략 또는 실패)는 캐시하지 않음
+            if updated_body is not cut_jobs[i][0]:
+                cache_store(cut_keys[i], updated_body)
+        yield updated_body
+
+def shape_from_brep(brep_text):
+    """
+    exportBrepToString 으로 직렬화된 BREP 문자열을 Shape 로 복원.
+    """
+    shape = Part.Shape()
+    shape.importBrepFromString(brep_text)
+    return shape
+
+def find_freecadcmd():
+    """
+    워커로 실행할 FreeCADCmd 경로를 반환.
+    """
+    if FREECADCMD:
+        return FREECADCMD
+    executable = "FreeCADCmd.exe" if os.name == "nt" else "FreeCADCmd"
+    candidate = os.path.join(FreeCAD.getHomePath(), "bin", executable)
+    return candidate if os.path.exists(candidate) else executable
+
+def start_worker(job, work_dir, worker_index):
+    """
+    job 을 JSON 작업 파일로 쓰고 이 매크로를 FreeCADCmd 워커로 실행.
+    (process, 결과 파일, 로그 파일) 을 반환하며, 실행하지 못하면 None.
+    """
+    job_file = os.path.join(work_dir, f"job_{worker_index}.json")
+    result_file = os.path.join(work_dir, f"result_{worker_index}.json")
+    log_file = os.path.join(work_dir, f"worker_{worker_index}.log")
+    with open(job_file, "w", encoding="utf-8") as f:
+        json.dump(job, f)
+
+    env = dict(os.environ)
+    env[WORKER_JOB_ENV] = job_file
+    env[WORKER_RESULT_ENV] = result_file
+    creationflags = subprocess.CREATE_NO_WINDOW if os.name == "nt" else 0
+    try:
+        with open(log_file, "w", encoding="utf-8") as log:
+            process = subprocess.Popen([find_freecadcmd(), os.path.abspath(__file__)], env=env,
+                                       stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                                       creationflags=creationflags)
+        return process, result_file, log_file
+    except OSError as e:
+        print(f"Error starting FreeCADCmd worker: {e}")
+        return None
+
+def wait_for_workers(processes):
+    """
+    start_worker 로 시작한 워커들을 기다리며 읽을 수 있는 결과 JSON 을 차례로 돌려줌.
+    모든 워커를 합쳐 WORKER_TIMEOUT 초가 지나면 남은 워커는 종료하고 건너뜀 (호출하는 쪽에서 다시 계산).
+    """
+    deadline = time.perf_counter() + WORKER_TIMEOUT
+    for process, result_file, log_file in processes:
+        try:
+            process.wait(timeout=max(0.0, deadline - time.perf_counter()))
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+            print(f"FreeCADCmd worker timed out after {WORKER_TIMEOUT} s and was stopped. See {log_file}")
+            continue
+        try:
+            with open(result_file, "r", encoding="utf-8") as f:
+                worker_output = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading worker result {result_file} (exit code {process.returncode}): {e}. See {log_file}")
+            continue
+        yield worker_output
+
+def cut_D_bodies_parallel(cut_jobs, workers):
+    """
+    (D_body, N_tools, label, lines) 작업들을 BREP 문자열로 직렬화하여 FreeCADCmd 워커 프로세스들에서 cut.
+    결과는 cut_jobs 와 같은 순서의 Shape 리스트이며, 워커가 돌려주지 못한 작업은 현재 프로세스에서 다시 계산.
+    """
+    results = [None] * len(cut_jobs)
+    pending = [i for i, (_, N_tools, _, _) in enumerate(cut_jobs) if N_tools]
+    for i, job in enumerate(cut_jobs):
+        if not job[1]:
+            results[i] = cut_D_body(*job)
+
+    work_dir = tempfile.mkdtemp(prefix="ppt_freecad_")
+    processes = []
+    print(f"Cutting {len(pending)} D bodies in {workers} FreeCADCmd workers...")
+    for worker_index in range(workers):
+        chunk = pending[worker_index::workers]
+        if not chunk:
+            continue
+        # 워커마다 필요한 N 바디만 한 번씩 직렬화하고, 각 D 작업은 그 인덱스만 참조
+        tool_indices = {}
+        tools = []
+        items = []
+        for i in chunk:
+            D_body, N_tools, label, lines = cut_jobs[i]
+            indices = []
+            for N_body in N_tools:
+                if id(N_body) not in tool_indices:
+                    tool_indices[id(N_body)] = len(tools)
+                    tools.append(N_body.exportBrepToString())
+                indices.append(tool_indices[id(N_body)])
+            items.append({"index": i, "label": label, "lines": list(lines),
+                          "shape": D_body.exportBrepToString(), "tools": indices})
+
+        process = start_worker({"task": "cut", "tools": tools, "items": items}, work_dir, worker_index)
+        if process:
+            processes.append(process)
+
+    for worker_output in wait_for_workers(processes):
+        for result in worker_output["results"]:
+            if result["shape"] is not None:
+                results[result["index"]] = shape_from_brep(result["shape"])
+        BOOLEAN_PROFILE.extend(worker_output.get("profile", []))
+
+    for i, updated_body in enumerate(results):
+        if updated_body is None:
+            print(f"{cut_jobs[i][2]} - No worker result. Cutting in this process.")
+            results[i] = cut_D_body(*cut_jobs[i])
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+def run_worker(job_file, result_file):
+    """
+    FreeCADCmd 워커 진입점. 작업 파일의 task 에 따라 cut 또는 메쉬 작업을 실행.
+    """
+    with open(job_file, "r", encoding="utf-8") as f:
+        job = json.load(f)
+    if job.get("task") == "mesh":
+        run_mesh_worker(job, result_file)
+    else:
+        run_cut_worker(job, result_file)
+
+def run_cut_worker(job, result_file):
+    """
+    작업의 D 바디들을 각자의 N 바디들로 cut 하여 BREP 문자열로 저장.
+    cut 이 실패한 항목은 None 으로 돌려주어 원래 프로세스가 다시 처리하게 함. 프로파일 기록도 함께 저장.
+    """
+    tools = [shape_from_brep(brep_text) for brep_text in job["tools"]]
+    results = []
+    for item in job["items"]:
+        D_body = shape_from_brep(item["shape"])
+        updated_body = cut_D_body(D_body, [tools[i] for i in item["tools"]], item["label"], item["lines"])
+        brep_text = updated_body.exportBrepToString() if updated_body is not D_body else None
+        results.append({"index": item["index"], "shape": brep_text})
+    with open(result_file, "w", encoding="utf-8") as f:
+        json.dump({"results": results, "profile": BOOLEAN_PROFILE}, f)
+
+def balanced_fuse(shapes):
+    """
+    인접한 두 Shape 씩 fuse 하는 트리 축소. 각 단계의 피연산자 크기가 비슷하게 유지됨.
+    """
+    level = list(shapes)
+    while len(level) > 1:
+        next_level = [level[i].fuse(level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            next_level.append(level[-1])
+        level = next_level
+    return level[0]
+
+def fuse_shapes(shapes, strategy=None):
+    """
+    여러 Shape 를 FUSE_STRATEGY (또는 strategy) 방식으로 하나로 합쳐 반환.
+    """
+    strategy = strategy or FUSE_STRATEGY
+    if not shapes:
+        return None
+    if len(shapes) == 1:
+        return shapes[0]
+
+    start = time.perf_counter()
+    if strategy == "multi":
+        try:
+            result = shapes[0].multiFuse(shapes[1:])
+        except Exception as e:
+            print(f"multiFuse failed ({e}). Falling back to balanced fusion.")
+            strategy = "balanced"
+    if strategy == "balanced":
+        result = balanced_fuse(shapes)
+    elif strategy == "chain":
+        result = shapes[0]
+        for shape in shapes[1:]:
+            result = result.fuse(shape)
+    elif strategy != "multi":
+        raise ValueError(f"Unknown fuse strategy: {strategy}")
+    print(f"Fused {len(shapes)} shapes ({strategy}) in {time.perf_counter() - start:.2f} s")
+    return result
+
+def base_face(shape):
+    """
+    z 방향으로 돌출된 프리미티브 솔리드(사각기둥/원기둥)의 밑면을 반환.
+    """
+    z_min = shape.BoundBox.ZMin
+    for face in shape.Faces:
+        if abs(face.BoundBox.ZMax - z_min) < 1e-9:
+            return face
+    raise ValueError("bottom face not found")
+
+def fuse_layers(members, label, by_color=False):
+    """
+    멤버 Primitive 들을 (z0, z_size) 층으로 나누고, 두 개 이상인 층은 밑면들을 2D 로 fuse 한 뒤
+    한 번만 돌출하여 [(층별 판 솔리드, 층 멤버 리스트)] 를 반환 (혼자인 층은 원래 솔리드 그대로).
+    by_color 이면 색상도 층 키에 포함하여 판마다 색상이 하나가 되게 함.
+    """
+    layers = {}
+    for member in members:
+        bbox = member.shape.BoundBox
+        layer_key = (round(bbox.ZMin, 6), round(bbox.ZLength, 6), member.color if by_color else None)
+        layers.setdefault(layer_key, []).append(member)
+
+    slabs = []
+    for (z_start, depth, _), layer_members in layers.items():
+        if len(layer_members) == 1:
+            slabs.append((layer_members[0].shape, layer_members))
+            continue
+        faces = [base_face(member.shape) for member in layer_members]
+        merged = profile_boolean("fuse2d", f"{label}_z{z_start:g}", faces,
+                                 [member.line_number for member in layer_members],
+                                 lambda: faces[0].multiFuse(faces[1:]).removeSplitter())
+        slabs.append((merged.extrude(FreeCAD.Vector(0, 0, depth)), layer_members))
+    if len(slabs) < len(members):
+        print(f"{label}: {len(members)} bodies merged into {len(slabs)} layer slabs.")
+    return slabs
+
+def overlap_clusters(entries):
+    """
+    BoundBox 겹침으로 연결된 그룹(sweep-and-prune + union-find)들을 멤버 Primitive 리스트로 반환.
+    CLUSTERED_FUSION 이 꺼져 있으면 전체가 한 그룹.
+    """
+    if CLUSTERED_FUSION and len(entries) > 1:
+        components = overlap_components([bound_box_tuple(entry.shape) for entry in entries])
+        print(f"{len(entries)} bodies form {len(components)} overlap clusters.")
+    else:
+        components = [list(range(len(entries)))]
+    return [[entries[i] for i in component] for component in components]
+
+def fuse_clusters(entries, label):
+    """
+    overlap_clusters 의 그룹마다 따로 fuse 하여
+    [(멤버 Primitive 리스트, fuse 결과, 캐시 키)] 를 반환. fuse 결과는 BREP 캐시를 사용.
+    label 은 프로파일에 기록할 클러스터 이름의 접두사 (label_1, label_2, ...).
+    """
+    return [fuse_cluster(members, f"{label}_{cluster_index + 1}")
+            for cluster_index, members in enumerate(overlap_clusters(entries))]
+
+def fuse_cluster(members, label):
+    """
+    겹침 클러스터 하나를 fuse 하여 (멤버 Primitive 리스트, fuse 결과, 캐시 키) 를 반환 (BREP 캐시 사용).
+    """
+    if len(members) == 1:
+        return members, members[0].shape, members[0].key
+    key = cache_key("fuse", LAYER_UNION, sorted(member.key for member in members))
+    fused = cache_load(key)
+    if fused is None:
+        if LAYER_UNION:
+            shapes = [slab for slab, _ in fuse_layers(members, label)]
+        else:
+            shapes = [member.shape for member in members]
+        if len(shapes) == 1:
+            fused = shapes[0]
         else:
-            N_SUM = N_SUM.fuse(N_body)
+            fused = profile_boolean("fuse", label, shapes,
+                                    [member.line_number for member in members], lambda: fuse_shapes(shapes))
+        cache_store(key, fused)
+    return members, fused, key
+
+def fuse_clustered(entries, label):
+    """
+    클러스터별 fuse 결과를 하나로 반환. 서로 떨어진 클러스터는 boolean 없이 compound 로 묶음.
+    """
+    shapes = [fused for _, fused, _ in fuse_clusters(entries, label)]
+    if not shapes:
+        return None
+    if len(shapes) == 1:
+        return shapes[0]
+    return Part.makeCompound(shapes)
+
+def fuse_N_bodies(N_bodies, label="N_SUM"):
+    print(f"Fusing {len(N_bodies)} N bodies into N_SUM...")
+    N_SUM = fuse_clustered(N_bodies, label)
     if N_SUM:
         debug_body(N_SUM, "N_SUM")
     return N_SUM
 
+def cut_P_cluster(P_cluster, N_local, label):
+    """
+    P 클러스터에서 겹치는 N 바디들(N_SUM)을 뺀 결과를 반환 (BREP 캐시 사용).
+    겹치는 N 이 없으면 boolean 없이, 결과가 null 이거나 오류가 나면 원본 클러스터를 반환.
+    """
+    members, fused, fused_key = P_cluster
+    if not N_local:
+        print(f"{label} does not intersect any N body. Skipping cut.")
+        return fused
+    key = cache_key("cut", fused_key, sorted(N_entry.key for N_entry in N_local))
+    cached = cache_load(key)
+    if cached is not None:
+        print(f"{label} - N_SUM loaded from the BREP cache.")
+        return cached
 
-def main():
-    # Create new document
-    doc = FreeCAD.newDocument("PPT_Model")
-    input_file = r"C:\\tmp_freecad\\ppt_freecad.txt"
+    N_SUM = fuse_N_bodies(N_local, f"{label}_N")
+    lines = [member.line_number for member in members] + [N_entry.line_number for N_entry in N_local]
+    try:
+        print(f"Calculating {label} - N_SUM...")
+        result = profile_boolean("cut", label, [fused, N_SUM], lines, lambda: fused.cut(N_SUM))
+    except Exception as e:
+        print(f"Error during {label} - N_SUM: {e}")
+        print(f"Showing original {label}.")
+        return fused
+    if result.isNull():
+        print(f"{label} - N_SUM resulted in a null body. Showing original {label}.")
+        return fused
+    cache_store(key, result)
+    return result
+
+def color_P_cluster(members, N_local, label):
+    """
+    P 클러스터를 겹치는 N 바디들과 함께 generalFuse 한 번으로 나누고, N 에 속하지 않은 P 조각만 남겨 합친
+    (결과 Shape, 면별 색상 리스트) 를 반환 (BREP 과 색상 모두 캐시 사용).
+    generalFuse 이력(피연산자별 조각)으로 각 조각의 원본 P 를 알고, 조각의 경계 면을 원본 색상에 대응시킨 뒤
+    합친 결과의 면에 한 번에 색상을 매김. 합친 뒤에도 그대로 남은 면은 같은 hashCode 를 가짐.
+    """
+    key = cache_key("color_cut", LAYER_UNION, sorted(member.key for member in members),
+                    sorted(N_entry.key for N_entry in N_local))
+    cached, cached_colors = cache_load(key), cache_load_colors(key)
+    if cached is not None and cached_colors is not None and len(cached_colors) == len(cached.Faces):
+        print(f"{label} loaded from the BREP cache.")
+        return cached, cached_colors
+
+    # 같은 층/색상의 P 는 판 하나로 합쳐 피연산자 수를 줄임
+    if LAYER_UNION and len(members) > 1:
+        P_parts = fuse_layers(members, label, by_color=True)
+    else:
+        P_parts = [(member.shape, [member]) for member in members]
+    if len(P_parts) == 1 and not N_local:
+        shape = P_parts[0][0]
+        return shape, [members[0].color] * len(shape.Faces)
+
+    operands = [shape for shape, _ in P_parts] + [N_entry.shape for N_entry in N_local]
+    lines = [member.line_number for member in members] + [N_entry.line_number for N_entry in N_local]
+    history = {}
+
+    def general_fuse():
+        pieces, history["pieces"] = operands[0].generalFuse(operands[1:])
+        return pieces
+
+    try:
+        print(f"Calculating {label} with generalFuse ({len(P_parts)} P, {len(N_local)} N operands)...")
+        profile_boolean("gfuse", label, operands, lines, general_fuse)
+    except Exception as e:
+        print(f"Error during {label} generalFuse: {e}. Using fuse + cut with a single color.")
+        shape = cut_P_cluster(fuse_cluster(members, label), N_local, label)
+        return shape, [P_DEFAULT_COLOR] * len(shape.Faces)
+
+    # N 피연산자에서 나온 조각(겹친 부분 포함)은 제거하고, 나머지 P 조각의 원본(P_parts 인덱스)을 기록
+    piece_map = history["pieces"]
+    N_pieces = {piece.hashCode() for pieces in piece_map[len(P_parts):] for piece in pieces}
+    kept, kept_sources = [], []
+    seen = set()
+    for source, pieces in enumerate(piece_map[:len(P_parts)]):
+        for piece in pieces:
+            piece_hash = piece.hashCode()
+            if piece_hash in N_pieces or piece_hash in seen:
+                continue
+            seen.add(piece_hash)
+            kept.append(piece)
+            kept_sources.append(source)
+    if not kept:
+        print(f"{label} - N removed every P piece. Showing the original cluster.")
+        shape = Part.makeCompound([shape for shape, _ in P_parts])
+        return shape, [P_DEFAULT_COLOR] * len(shape.Faces)
+
+    # 면 hashCode -> 원본. 두 조각이 공유하는 면은 합치면 사라지는 내부 면
+    face_sources = {}
+    for piece, source in zip(kept, kept_sources):
+        for face in piece.Faces:
+            face_sources.setdefault(face.hashCode(), source)
+
+    if len(kept) == 1:
+        result = kept[0]
+    else:
+        result = profile_boolean("fuse", f"{label}_pieces", kept, lines, lambda: kept[0].multiFuse(kept[1:]))
+
+    palette = np.array([layer_members[0].color for _, layer_members in P_parts] + [P_DEFAULT_COLOR])
+    source_index = np.array([face_sources.get(face.hashCode(), -1) for face in result.Faces], dtype=int)
+    face_colors = [tuple(color) for color in palette[source_index].tolist()]
+    unmatched = int(np.count_nonzero(source_index < 0))
+    if unmatched:
+        print(f"{label} - {unmatched} faces have no source primitive. Using the default color.")
+    cache_store(key, result)
+    cache_store_colors(key, face_colors)
+    return result, face_colors
 
-    # Generate bodies and text positions
-    P_bodies, D_bodies, N_bodies, text_positions = generate_bodies(input_file)
 
-    # Fuse P bodies
-    P_SUM = fuse_P_bodies(P_bodies) if P_bodies else None
-    print(f"P_SUM created: {'Yes' if P_SUM else 'No'}")
+def export_results(result_objects, step_file=None, brep_file=None):
+    """
+    최종 솔리드 객체들을 STEP / BREP 파일로 내보냄 (지정된 경로만).
+    """
+    for export_file in (step_file, brep_file):
+        if not export_file:
+            continue
+        try:
+            Part.export(result_objects, export_file)
+            print(f"Exported {len(result_objects)} solids to {export_file}")
+        except Exception as e:
+            print(f"Error exporting {export_file}: {e}")
 
-    # Fuse N bodies
-    N_SUM = fuse_N_bodies(N_bodies) if N_bodies else None
-    print(f"N_SUM created: {'Yes' if N_SUM else 'No'}")
+def tessellate_shape(shape, with_faces=False):
+    """
+    Shape 를 MESH_LINEAR_DEFLECTION / MESH_ANGULAR_DEFLECTION 으로 테셀레이션하여
+    (points (n, 3) float32, facets (m, 3) int32, 삼각형별 면 인덱스 (m,) int32 또는 None) 배열을 반환.
+    with_faces 이면 면마다 메쉬 세그먼트를 만들어 각 삼각형이 shape.Faces 의 몇 번째 면인지 함께 반환.
+    MeshPart 가 없으면 Part 의 tessellate (선형 편차만 적용) 로 대체 (면 인덱스가 필요하면 면별로).
+    """
+    face_index = None
+    try:
+        import MeshPart
+        mesh = MeshPart.meshFromShape(Shape=shape, LinearDeflection=MESH_LINEAR_DEFLECTION,
+                                      AngularDeflection=MESH_ANGULAR_DEFLECTION, Relative=False,
+                                      Segments=with_faces)
+        points, facets = mesh.Topology
+        if with_faces and mesh.countSegments() == len(shape.Faces):
+            face_index = np.empty(len(facets), dtype=np.int32)
+            for i in range(mesh.countSegments()):
+                face_index[mesh.getSegment(i)] = i
+    except ImportError:
+        if with_faces:
+            points, facets, face_index = [], [], []
+            for i, face in enumerate(shape.Faces):
+                face_points, face_facets = face.tessellate(MESH_LINEAR_DEFLECTION)
+                facets.extend((a + len(points), b + len(points), c + len(points)) for a, b, c in face_facets)
+                points.extend(face_points)
+                face_index.extend([i] * len(face_facets))
+            face_index = np.array(face_index, dtype=np.int32)
+        else:
+            points, facets = shape.tessellate(MESH_LINEAR_DEFLECTION)
+    if with_faces and face_index is None:
+        print("Mesh segments do not match the shape faces. Using the body color.")
+    return (np.array([(point.x, point.y, point.z) for point in points], dtype=np.float32).reshape(-1, 3),
+            np.array(facets, dtype=np.int32).reshape(-1, 3), face_index)
 
-    # P_SUM 처리 (P_SUM이 있는 경우에만)
-    if P_SUM:
-        # N_SUM이 있을 경우에만 cut 연산 수행
-        if N_SUM:
+def run_mesh_worker(job, result_file):
+    """
+    작업의 바디들을 테셀레이션하여 바디마다 .npy 파일(points, facets, 면 인덱스가 있으면 faces)로 저장하고 경로를 기록.
+    """
+    results = []
+    for item in job["items"]:
+        try:
+            points, facets, face_index = tessellate_shape(shape_from_brep(item["shape"]), item["with_faces"])
+        except Exception as e:
+            print(f"Error tessellating {item['label']}: {e}")
+            continue
+        result = {"index": item["index"]}
+        for name, array in (("points", points), ("facets", facets), ("faces", face_index)):
+            if array is not None:
+                result[name] = os.path.join(job["work_dir"], f"mesh_{item['index']}_{name}.npy")
+                np.save(result[name], array)
+        results.append(result)
+    with open(result_file, "w", encoding="utf-8") as f:
+        json.dump({"results": results}, f)
+
+def tessellate_bodies(mesh_bodies, workers):
+    """
+    (label, Shape, color, face_colors) 바디들의 테셀레이션 결과 (points, facets, face_index) 를
+    바디 순서대로 하나씩 돌려줌. face_colors 가 있는 바디만 삼각형별 면 인덱스를 계산.
+    workers > 0 이면 FreeCADCmd 워커들이 .npy 파일로 저장한 결과를 읽고,
+    워커가 돌려주지 못한 바디와 workers == 0 인 경우는 현재 프로세스에서 테셀레이션.
+    한 번에 바디 하나의 메쉬만 메모리에 올림.
+    """
+    mesh_files = {}
+    work_dir = None
+    if workers > 0 and len(mesh_bodies) > 1:
+        work_dir = tempfile.mkdtemp(prefix="ppt_freecad_mesh_")
+        processes = []
+        print(f"Tessellating {len(mesh_bodies)} bodies in {workers} FreeCADCmd workers...")
+        for worker_index in range(workers):
+            items = [{"index": i, "label": label, "shape": shape.exportBrepToString(),
+                      "with_faces": face_colors is not None}
+                     for i, (label, shape, _, face_colors) in enumerate(mesh_bodies) if i % workers == worker_index]
+            if not items:
+                continue
+            process = start_worker({"task": "mesh", "work_dir": work_dir, "items": items}, work_dir, worker_index)
+            if process:
+                processes.append(process)
+        for worker_output in wait_for_workers(processes):
+            for result in worker_output["results"]:
+                mesh_files[result["index"]] = result
+
+    try:
+        for i, (label, shape, _, face_colors) in enumerate(mesh_bodies):
             try:
-                print("Calculating P_SUM - N_SUM...")
-                P_SUM_UPDATED = P_SUM.cut(N_SUM)
-                if not P_SUM_UPDATED.isNull():
-                    updated_obj = Part.show(P_SUM_UPDATED)
-                    apply_color_to_body(updated_obj, (0.9, 0.9, 0.9))
+                if i in mesh_files:
+                    result = mesh_files[i]
+                    mesh = (np.load(result["points"]), np.load(result["facets"]),
+                            np.load(result["faces"]) if "faces" in result else None)
                 else:
-                    print("P_SUM - N_SUM resulted in a null body. Showing original P_SUM.")
-                    updated_obj = Part.show(P_SUM)
-                    apply_color_to_body(updated_obj, (0.9, 0.9, 0.9))
+                    mesh = tessellate_shape(shape, face_colors is not None)
             except Exception as e:
-                print(f"Error during P_SUM - N_SUM: {e}")
-                print("Showing original P_SUM.")
-                updated_obj = Part.show(P_SUM)
-                apply_color_to_body(updated_obj, (0.9, 0.9, 0.9))
+                print(f"Error tessellating {label}: {e}")
+                mesh = None
+            yield mesh
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+def export_meshes(mesh_bodies, stl_file=None, threemf_file=None):
+    """
+    (label, Shape, color, face_colors) 최종 바디들을 테셀레이션하여 바이너리 STL 과 3MF 로 색상과 함께 저장.
+    face_colors (shape.Faces 순서의 면별 색상) 가 있는 바디는 삼각형마다 원본 면의 색상을, 없으면 color 를 씀.
+    바디 하나씩 파일에 바로 기록.
+    """
+    if not mesh_bodies or not (stl_file or threemf_file):
+        return
+    start = time.perf_counter()
+    # 3MF 색상 목록: 바디 색상 (바디 순서) 뒤에 각 바디의 면 색상 팔레트를 이어 붙임
+    colors = [color for _, _, color, _ in mesh_bodies]
+    face_palettes = []
+    for _, _, _, face_colors in mesh_bodies:
+        if face_colors is None:
+            face_palettes.append(None)
+            continue
+        face_colors = np.array(face_colors, dtype=float).reshape(-1, 3)
+        palette, face_material = np.unique(face_colors, axis=0, return_inverse=True)
+        face_palettes.append((face_colors, face_material.ravel() + len(colors)))
+        colors.extend(tuple(color) for color in palette.tolist())
+    stl_writer = BinaryStlWriter(stl_file) if stl_file else None
+    threemf_writer = ThreeMFWriter(threemf_file, colors) if threemf_file else None
+    try:
+        for i, ((label, _, color, _), face_palette, mesh) in enumerate(
+                zip(mesh_bodies, face_palettes, tessellate_bodies(mesh_bodies, MESH_WORKERS))):
+            if mesh is None:
+                continue
+            points, facets, face_index = mesh
+            if face_palette is None or face_index is None:
+                triangle_colors, triangle_materials = color, None
+            else:
+                face_colors, face_material = face_palette
+                triangle_colors, triangle_materials = face_colors[face_index], face_material[face_index]
+            if stl_writer:
+                stl_writer.add(points, facets, triangle_colors)
+            if threemf_writer:
+                threemf_writer.add(points, facets, i, label, triangle_materials)
+    finally:
+        if stl_writer:
+            stl_writer.close()
+        if threemf_writer:
+            threemf_writer.close()
+    for export_file in (stl_file, threemf_file):
+        if export_file:
+            print(f"Exported {len(mesh_bodies)} meshes to {export_file}")
+    print(f"Mesh export took {time.perf_counter() - start:.2f} s")
+
+def finish_document(doc, output_file=None):
+    """
+    GUI 에서는 축측 뷰로 전체를 맞춘 뒤, recompute 하고 output_file 이 있으면 저장.
+    """
+    if FreeCAD.GuiUp:
+        try:
+            view = FreeCADGui.getDocument(doc.Name).ActiveView
+            view.viewAxonometric()
+            focus_on_all_objects(doc)
+            FreeCADGui.updateGui()
+        except Exception as e:
+            print(f"Error setting up view: {e}")
+    try:
+        doc.recompute()
+        if output_file:
+            doc.saveAs(output_file)
+            print(f"Saved {output_file}")
+    except Exception as e:
+        print(f"Error during final processing: {e}")
+
+def show_preview_compound(doc, entries, label, color=None, transparency=0):
+    """
+    프리미티브들을 boolean 없이 compound 하나로 doc 에 표시. color 가 없으면 각 프리미티브의 색상을 면별로 지정.
+    """
+    if not entries:
+        return None
+    obj = doc.addObject("Part::Feature", label)
+    obj.Shape = Part.makeCompound([entry.shape for entry in entries])
+    obj.Label = label
+    apply_display_tessellation(obj)
+    if obj.ViewObject is None:  # FreeCADCmd 배치 모드에는 뷰 속성이 없음
+        return obj
+    if color:
+        obj.ViewObject.ShapeColor = color
+    else:
+        obj.ViewObject.ShapeColor = entries[0].color
+        obj.ViewObject.DiffuseColor = [entry.color for entry in entries for _ in entry.shape.Faces]
+    obj.ViewObject.Transparency = transparency
+    return obj
+
+def preview(input_file=INPUT_FILE, output_file=None):
+    """
+    미리보기: 모든 프리미티브를 만들어 바디 타입별 compound 세 개(P, D, N)와 라벨만 표시.
+    fuse/cut 을 하지 않으므로 층과 위치만 빠르게 확인하며, 전체 계산은 main 으로 따로 실행.
+    """
+    start = time.perf_counter()
+    doc = FreeCAD.newDocument("PPT_Preview")
+    P_bodies, D_bodies, N_bodies, text_positions = generate_bodies(input_file)
+    show_preview_compound(doc, P_bodies, "P_preview", (0.9, 0.9, 0.9))
+    show_preview_compound(doc, D_bodies, "D_preview")
+    show_preview_compound(doc, N_bodies, "N_preview", transparency=PREVIEW_N_TRANSPARENCY)
+    add_texts(doc, text_positions)
+    finish_document(doc, output_file)
+    print(f"Preview of {len(P_bodies)} P, {len(D_bodies)} D, {len(N_bodies)} N bodies "
+          f"in {time.perf_counter() - start:.2f} s (no booleans).")
+    return doc
+
+def build_model(doc, input_file, output_file, step_file=None, brep_file=None, stl_file=None, threemf_file=None):
+    """
+    ppt_freecad.txt 로부터 모델을 만드는 generator. 각 단계(P 클러스터, D 바디 하나 등)를 실행하기 직전에
+    (완료 단계 수, 전체 단계 수, 다음 작업 설명) 을 yield 하며, 결과 객체는 만들어지는 대로 문서에 추가.
+    """
+    BOOLEAN_PROFILE.clear()
+    result_objects = []
+    mesh_bodies = []  # STL/3MF 로 내보낼 (label, Shape, color, 면별 색상 또는 None)
+
+    # Generate bodies and text positions
+    yield 0, 1, f"Reading {os.path.basename(input_file)}"
+    P_bodies, D_bodies, N_bodies, text_positions = generate_bodies(input_file)
+    overlap_map = load_overlap_map(input_file)
+    N_index = build_N_index(N_bodies)
+    P_clusters = overlap_clusters(P_bodies) if P_bodies else []
+    total = 1 + len(P_clusters) + len(D_bodies) + 2
+    done = 1
+
+    # P_SUM 처리: 각 P 클러스터를 자신과 겹치는 N 바디로만 cut 하므로,
+    # 프리미티브 하나를 고치면 그 클러스터의 fuse/cut 만 다시 계산됨 (나머지는 BREP 캐시)
+    # P_FACE_COLORS 이면 클러스터마다 generalFuse 한 번으로 fuse/cut 하고 면마다 원본 P 색상 유지
+    P_parts = []
+    P_face_colors = []
+    P_SUM_obj = None
+    if P_bodies:
+        print(f"Fusing {len(P_bodies)} P bodies into P_SUM{' with per-face colors' if P_FACE_COLORS else ''}...")
+    for i, members in enumerate(P_clusters):
+        label = f"P_cluster_{i + 1}"
+        yield done, total, f"{label}: {len(members)} P bodies"
+        P_N_bodies = select_N_bodies(N_bodies, N_index, overlap_map, members)
+        if P_FACE_COLORS:
+            shape, face_colors = color_P_cluster(members, P_N_bodies, label)
+            P_face_colors.extend(face_colors)
         else:
-            # N_SUM이 없는 경우 원본 P_SUM 표시
-            print("N_SUM not present. Showing original P_SUM.")
-            updated_obj = Part.show(P_SUM)
-            apply_color_to_body(updated_obj, (0.9, 0.9, 0.9))
+            shape = cut_P_cluster(fuse_cluster(members, label), P_N_bodies, label)
+        P_parts.append(shape)
+        done += 1
+
+        # 클러스터가 끝날 때마다 P_SUM 객체를 갱신
+        P_SUM_UPDATED = P_parts[0] if len(P_parts) == 1 else Part.makeCompound(P_parts)
+        if P_SUM_obj is None:
+            P_SUM_obj = show_shape(doc, P_SUM_UPDATED, "P_SUM", P_DEFAULT_COLOR)
+        else:
+            P_SUM_obj.Shape = P_SUM_UPDATED
+            apply_color_to_body(P_SUM_obj, P_DEFAULT_COLOR)
+        if P_face_colors:
+            apply_face_colors(P_SUM_obj, P_face_colors)
+    print(f"P_SUM created: {'Yes' if P_parts else 'No'}")
+
+    if P_parts:
+        debug_body(P_SUM_UPDATED, "P_SUM")
+        result_objects.append(P_SUM_obj)
+        mesh_bodies.append(("P_SUM", P_SUM_UPDATED, P_DEFAULT_COLOR, P_face_colors or None))
     else:
         print("No P_SUM present. Proceeding with D bodies only.")
 
     # D_bodies 처리
     if D_bodies:
-        for i, (D_body, D_obj, D_color) in enumerate(D_bodies):
-            try:
-                # N_SUM이 있을 경우에만 cut 연산 수행
-                if N_SUM:
-                    print(f"Processing D_body {i + 1} - Subtracting N_SUM...")
-                    updated_D_body = D_body.cut(N_SUM)
-                    if not updated_D_body.isNull():
-                        updated_obj = Part.show(updated_D_body)
-                    else:
-                        print(f"D_body {i + 1} - N_SUM resulted in a null body. Showing original D_body.")
-                        updated_obj = Part.show(D_body)
-                else:
-                    # N_SUM이 없는 경우 원본 D_body 표시
-                    print(f"N_SUM not present. Showing original D_body {i + 1}.")
-                    updated_obj = Part.show(D_body)
-                
-                updated_obj.Label = f"D_body_{i + 1}"
-                apply_color_to_body(updated_obj, D_color)
-                debug_body(updated_obj.Shape, f"D_body_{i + 1}")
+        # 이 D 바디와 겹치는 N 바디만 cut 대상으로 사용 (없으면 boolean 생략)
+        cut_jobs = []
+        cut_keys = []
+        for i, D_entry in enumerate(D_bodies):
+            D_N_bodies = select_N_bodies(N_bodies, N_index, overlap_map, [D_entry])
+            cut_jobs.append((D_entry.shape, [N_entry.shape for N_entry in D_N_bodies], f"D_body_{i + 1}",
+                             [D_entry.line_number] + [N_entry.line_number for N_entry in D_N_bodies]))
+            cut_keys.append(cache_key("cut", D_entry.key, sorted(N_entry.key for N_entry in D_N_bodies))
+                            if D_N_bodies else None)
 
-            except Exception as e:
-                print(f"Error processing D_body {i + 1}: {e}")
-                print(f"Showing original D_body {i + 1}.")
-                try:
-                    updated_obj = Part.show(D_body)
-                    updated_obj.Label = f"D_body_{i + 1}"
-                    apply_color_to_body(updated_obj, D_color)
-                except Exception as e2:
-                    print(f"Error showing original D_body {i + 1}: {e2}")
+        D_cuts = iter_D_cuts(cut_jobs, cut_keys)
+        for D_entry, (_, N_tools, label, _) in zip(D_bodies, cut_jobs):
+            yield done, total, f"{label}: cut {len(N_tools)} N bodies"
+            updated_body, obj = show_D_body(doc, next(D_cuts), D_entry.color, label)
+            if obj is not None:
+                result_objects.append(obj)
+                mesh_bodies.append((label, updated_body, D_entry.color, None))
+            done += 1
     else:
         print("No D bodies present.")
 
 
     # Add texts
-    # 텍스트 추가
-    for text, (x, y, z) in text_positions:
-        # 색상 및 텍스트 분리
-        if '.' in text:
-            prefix, content = text.split('.', 1)
-            color_map = {
-                'b': (0.0, 0.0, 0.0),  # 검정
-                'w': (1.0, 1.0, 1.0),  # 흰색
-                'r': (1.0, 0.0, 0.0),  # 빨강
-                's': (0.0, 0.0, 1.0),  # 파랑
-                'y': (1.0, 1.0, 0.0),  # 노랑
-                'g': (0.0, 1.0, 0.0),  # 그린
-                'o': (1.0, 0.5, 0.0),  # 오렌지
-                'p': (0.5, 0.0, 0.5),  # 보라
-                'i': (0.0, 0.0, 0.5),  # 남색
-                'c': (0.0, 1.0, 1.0),  # 시안
-            }
-            color = color_map.get(prefix.lower(), (1.0, 0.0, 0.0))  # 기본값: 빨강
-        else:
-            content = text
-            color = (0, 0, 0)  # 기본값: 검장
+    # 텍스트 추가 (색상별로 묶어서)
+    yield done, total, f"Adding {len(text_positions)} labels"
+    add_texts(doc, text_positions)
+    done += 1
 
-        # 텍스트와 접두사 분리
-        if '.' in text:
-            prefix, content = text.split('.', 1)  # content에 텍스트 내용을 저장
-        else:
-            prefix, content = '', text           # content에 원래 text 저장
 
-        # 텍스트 위치 계산 및 추가
-        add_text_to_plane(
-            text=content,  # 분리된 텍스트
-            position=(x - FONT_SIZE * (len(content) / 20), y - FONT_SIZE / 3),
-            z_position=z + 0.5,
-            height=FONT_SIZE,
-            color=color  # 분리된 색상
-        )
+    # Set up view and save
+    yield done, total, f"Saving {os.path.basename(output_file)}"
+    finish_document(doc, output_file)
+    export_results(result_objects, step_file, brep_file)
+    export_meshes(mesh_bodies, stl_file, threemf_file)
+    save_profile_report(os.path.splitext(output_file)[0] + PROFILE_SUFFIX)
+    evict_cache()
 
+def run_with_progress(steps, title, doc):
+    """
+    build_model 같은 단계 generator 를 QTimer 로 한 단계씩 실행. 단계 사이에 Qt 이벤트 루프가 돌아
+    GUI 가 멈추지 않으며, 진행 대화상자에 현재 작업과 남은 시간을 표시하고 취소하면 generator 를 닫음.
+    (이미 doc 에 추가된 결과는 그대로 남음. 실행 중 사용자가 다른 문서를 열어도 doc 만 다룸)
+    """
+    from PySide2.QtCore import QTimer
+    from PySide2.QtWidgets import QProgressDialog
 
-    # Set up view and save
-    try:
-        view = FreeCADGui.ActiveDocument.ActiveView
-        view.viewAxonometric()
-        focus_on_all_objects()
-        FreeCADGui.updateGui()
-        FreeCAD.ActiveDocument.recompute()
-        FreeCAD.ActiveDocument.saveAs(r"C:\tmp_freecad\PPT_Model_with_text.FCStd")
-    except Exception as e:
-        print(f"Error during final processing: {e}")
+    dialog = QProgressDialog("Starting...", "Cancel", 0, 1, FreeCADGui.getMainWindow())
+    dialog.setWindowTitle(title)
+    dialog.setMinimumDuration(0)
+    dialog.setAutoClose(False)
+    dialog.setAutoReset(False)
+    dialog.show()
+    start = time.perf_counter()
+
+    def run_next_step():
+        if dialog.wasCanceled():
+            steps.close()
+            dialog.close()
+            doc.recompute()
+            print("Canceled. Results computed so far are kept in the document.")
+            return
+        try:
+            done, total, message = next(steps)
+        except StopIteration:
+            dialog.close()
+            print(f"Finished in {time.perf_counter() - start:.1f} s")
+            return
+        except Exception as e:
+            dialog.close()
+            print(f"Error during {title}: {e}")
+            return
+        elapsed = time.perf_counter() - start
+        eta = f"{elapsed / done * (total - done):.0f} s" if done else "-"
+        dialog.setMaximum(total)
+        dialog.setValue(done)
+        dialog.setLabelText(f"{message}\n{done}/{total} steps, elapsed {elapsed:.0f} s, ETA {eta}")
+        QTimer.singleShot(0, run_next_step)
+
+    QTimer.singleShot(0, run_next_step)
+
+def main(input_file=INPUT_FILE, output_file=OUTPUT_FILE, step_file=None, brep_file=None,
+         stl_file=None, threemf_file=None):
+    # Create new document
+    doc = FreeCAD.newDocument("PPT_Model")
+    steps = build_model(doc, input_file, output_file, step_file, brep_file, stl_file, threemf_file)
+    if FreeCAD.GuiUp and GUI_PROGRESS:
+        # GUI 에서는 타이머가 단계를 이어서 실행하므로 바로 반환
+        run_with_progress(steps, "PPT to FreeCAD", doc)
+    else:
+        for _ in steps:
+            pass
+    return doc
+
+def batch_main(argv):
+    """
+    GUI 없는 배치 진입점. FreeCADCmd 에서는 --pass 뒤의 인자를 사용:
+        FreeCADCmd freecad_macro.py --pass input.txt output.FCStd --step out.step --brep out.brep --stl out.stl --3mf out.3mf
+    FreeCAD 라이브러리를 PYTHONPATH 에 둔 일반 python 에서는 스크립트 뒤의 인자를 그대로 사용.
+    """
+    global FUSE_STRATEGY, D_CUT_WORKERS, MESH_WORKERS, MESH_LINEAR_DEFLECTION, MESH_ANGULAR_DEFLECTION, TEXT_FONT_FILE
+    if "--pass" in argv:
+        args = argv[argv.index("--pass") + 1:]
+    else:
+        script_name = os.path.basename(__file__)
+        script_positions = [i for i, arg in enumerate(argv) if os.path.basename(arg) == script_name]
+        args = argv[script_positions[-1] + 1:] if script_positions else []
+
+    parser = argparse.ArgumentParser(prog="freecad_macro.py", description="ppt_freecad.txt 를 FreeCAD 솔리드로 변환 (GUI 없음)")
+    parser.add_argument("input_file", nargs="?", default=INPUT_FILE, help="ppt_freecad.txt 경로")
+    parser.add_argument("output_file", nargs="?", default=OUTPUT_FILE, help="저장할 FCStd 경로")
+    parser.add_argument("--step", help="최종 솔리드를 STEP 으로도 저장")
+    parser.add_argument("--brep", help="최종 솔리드를 BREP 으로도 저장")
+    parser.add_argument("--preview", action="store_true",
+                        help="boolean 없이 P/D/N compound 만 만들어 저장 (층/위치 확인용)")
+    parser.add_argument("--stl", help="최종 솔리드를 색상 포함 바이너리 STL 로도 저장")
+    parser.add_argument("--3mf", dest="threemf", help="최종 솔리드를 색상 포함 3MF 로도 저장")
+    parser.add_argument("--linear-deflection", type=float, default=MESH_LINEAR_DEFLECTION, help="메쉬 선형 편차 (mm)")
+    parser.add_argument("--angular-deflection", type=float, default=MESH_ANGULAR_DEFLECTION, help="메쉬 각도 편차 (rad)")
+    parser.add_argument("--mesh-workers", type=int, default=MESH_WORKERS, help="테셀레이션용 FreeCADCmd 워커 수")
+    parser.add_argument("--fuse-strategy", choices=["multi", "balanced", "chain"], default=FUSE_STRATEGY)
+    parser.add_argument("--workers", type=int, default=D_CUT_WORKERS, help="D 바디 cut 용 FreeCADCmd 워커 수")
+    parser.add_argument("--font", default=TEXT_FONT_FILE, help="라벨 ShapeString 글꼴 파일 (기본: 자동으로 찾음)")
+    options = parser.parse_args(args)
+
+    FUSE_STRATEGY = options.fuse_strategy
+    D_CUT_WORKERS = options.workers
+    MESH_WORKERS = options.mesh_workers
+    MESH_LINEAR_DEFLECTION = options.linear_deflection
+    MESH_ANGULAR_DEFLECTION = options.angular_deflection
+    TEXT_FONT_FILE = options.font
+    if options.preview:
+        preview(options.input_file, options.output_file)
+        return
+    main(options.input_file, options.output_file, options.step, options.brep, options.stl, options.threemf)
 
 if __name__ == "__main__":
-    main()
+    if os.environ.get(WORKER_JOB_ENV):
+        exit_code = 1
+        try:
+            run_worker(os.environ[WORKER_JOB_ENV], os.environ[WORKER_RESULT_ENV])
+            exit_code = 0
+        except Exception:
+            traceback.print_exc()
+        finally:
+            # 로그 파일로 보낸 출력은 버퍼에 남아 있으므로 os._exit 전에 비움
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(exit_code)  # FreeCADCmd 가 대화형 콘솔로 남지 않도록 바로 종료
+    if FreeCAD.GuiUp:
+        if PREVIEW_MODE:
+            preview()
+        else:
+            main()
+    else:
+        batch_main(sys.argv)
 
@@ -1,41 +1,71 @@
 # 설명서
 DESCRIPTION = """
 코드 설명서:
-1. PowerPoint 파일의 첫 번째 슬라이드만을 처리합니다.
+1. PowerPoint 파일의 모든 슬라이드를 처리합니다.
 2. 위쪽 방향으로 그려진, x축 크기가 0인 화살표만을 유효 화살표로 인식하고 그래프 곡선에 일치하도록 처리합니다.
-3. 슬라이드 내 사각형의 크기를 기준으로 좌표 보정 범위를 설정하여, 해당 범위 내에서 좌표가 조정됩니다.
-4. 슬라이드 하단에 아래와 같은 형식의 문자 상자가 있어야 하며, 이 상자에서 보정 범위 값을 추출합니다.
+3. 슬라이드 내 사각형 하나가 그래프 영역 하나이며, 사각형의 크기를 기준으로 좌표 보정 범위를 설정하여, 해당 범위 내에서 좌표가 조정됩니다.
+   한 슬라이드에 그래프가 여러 개이면 화살표는 위치를 포함하는(없으면 가장 가까운) 사각형의 그래프에 속합니다.
+4. 각 사각형 안이나 가까이에 아래와 같은 형식의 문자 상자가 있어야 하며, 그 문자 상자에서 보정 범위 값을 추출합니다.
+   문자 상자 하나는 사각형 하나에만 쓰이며(안에 있는 사각형 우선, 그다음 가까운 순), 짝이 없는 사각형은 건너뜁니다.
+   사각형이 하나뿐이고 문자 상자가 없으면 기본값을 사용합니다.
     x_min=log10(1000)
     x_max=log10(30000)
     y_min=100
     y_max=150
-5. 슬라이드 최상단에 위치한 텍스트 상자의 텍스트를 그래프의 타이틀로 사용합니다.
+   값은 숫자, + - * / ** ^, 괄호, log10/ln/reciprocal/sqrt 함수, pi/e 로 된 식입니다.
+   log10(...), ln(...), reciprocal(...) 로 쓰면 그 축은 해당 눈금(로그, 자연로그, 역수)으로 처리합니다.
+   x_scale=log10 처럼 눈금을 따로 쓰면 x_min, x_max 는 데이터 값 그대로 적습니다. (linear, log10, ln, reciprocal)
+5. 사각형 바로 위의 텍스트 상자(없으면 슬라이드 최상단 텍스트 상자)의 텍스트를 그래프의 타이틀로 사용합니다.
+6. 화살표는 곡선별로 나눕니다. 그룹으로 묶은 화살표는 그룹 하나가 곡선 하나이고, 그룹 밖의 화살표는 선 색상별로 나눕니다.
+7. --headless 로 실행하면 창 없이 원본/보간 좌표(CSV, NPZ)와 그래프(PNG)를 파일로 저장합니다. (Tk, win32 불필요)
+   다른 스크립트에서는 digitize() 함수를 import 하여 배열을 바로 받을 수 있습니다.
 """
 
 import io
 import sys
 import os
 import re
+import ast
+import csv
+import math
+import argparse
+import operator
 import shutil
 import tempfile
+from collections import namedtuple
 from pptx import Presentation
+from pptx.enum.dml import MSO_COLOR_TYPE
 from pptx.enum.shapes import MSO_SHAPE_TYPE
 from pptx.enum.shapes import MSO_AUTO_SHAPE_TYPE
-import matplotlib.pyplot as plt
 import numpy as np
-from PIL import Image
-import win32clipboard
-import tkinter as tk
-from tkinter import messagebox
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from scipy.interpolate import PchipInterpolator
-from math import log10
+# Tk, win32clipboard, PIL, pyplot 은 창을 띄울 때만 import (헤드리스 모드는 Agg 만 사용)
+
+INTERPOLATION_POINTS = 500  # 곡선 하나의 보간 좌표 수
+EXPORT_FORMATS = ("csv", "npz", "png")
+
+# 보정 범위 값은 공백을 모두 지운 텍스트에서 다음 키(x_..., y_...) 전까지의 식
+RANGE_PATTERN = re.compile(r'(x_min|x_max|y_min|y_max)=((?:log10|ln|reciprocal|sqrt|pi|[\d.eE+\-*/^()])+)')
+SCALE_PATTERN = re.compile(r'(x_scale|y_scale)=(linear|log10|ln|reciprocal)')
+RANGE_KEYS = ("x_min", "x_max", "y_min", "y_max")
+
+# 보정 범위 식에서 허용하는 함수, 상수, 연산자 (eval 대신 ast 로 계산)
+EXPRESSION_FUNCTIONS = {"log10": math.log10, "ln": math.log, "reciprocal": lambda value: 1 / value, "sqrt": math.sqrt}
+EXPRESSION_CONSTANTS = {"pi": math.pi, "e": math.e}
+BINARY_OPERATORS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+                    ast.Div: operator.truediv, ast.Pow: operator.pow}
+UNARY_OPERATORS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+
+# 그래프 영역 하나 (좌표는 슬라이드 아래쪽이 원점인 EMU, 보정 범위가 잘못되면 x_axis, y_axis 는 None)
+PlotRegion = namedtuple("PlotRegion", ["slide", "index", "left", "bottom", "width", "height",
+                                       "x_axis", "y_axis", "title"])
+# 곡선 하나의 데이터 좌표 (슬라이드에서 왼쪽부터의 순서)
+DigitizedCurve = namedtuple("DigitizedCurve", ["slide", "region", "curve", "x", "y"])
+# 전체 결과를 한 배열로 모은 행: (슬라이드 번호, 그래프 번호, 곡선 이름, x, y)
+DATASET_DTYPE = np.dtype([("slide", int), ("region", int), ("curve", "U64"), ("x", float), ("y", float)])
+# digitize() 결과: 그래프 영역 리스트, 원본/보간 좌표 (DATASET_DTYPE 배열), 저장한 파일 경로 리스트
+DigitizeResult = namedtuple("DigitizeResult", ["regions", "raw", "interpolated", "files"])
 
-global has_log10
-has_log10 = False  # log10 포함 여부 플래그 (글로벌 변수)
-
-# 전역 변수 선언
-x1_rect = y1_rect = x2_rect = y2_rect = None
 
 def open_presentation(ppt_file):
     """프레젠테이션 파일을 임시 폴더에 복사본을 생성하여 엽니다."""
@@ -45,8 +75,9 @@ def open_presentation(ppt_file):
             
             return None, None
 
-        temp_dir = tempfile.gettempdir()
-        temp_file = os.path.join(temp_dir, "temp_presentation_copy.pptx")
+        # 여러 파일을 연달아(또는 동시에) 처리할 수 있도록 복사본 이름은 매번 새로 만듦
+        fd, temp_file = tempfile.mkstemp(suffix=".pptx")
+        os.close(fd)
         shutil.copy2(ppt_file, temp_file)
         
         prs = Presentation(temp_file)
@@ -59,95 +90,268 @@ def open_presentation(ppt_file):
         return None, None
 
 
-def extract_title_from_ppt(prs):
-    """PPT에서 첫 번째 슬라이드의 첫 번째 줄을 제목으로 사용합니다."""
-    slide = prs.slides[0]
-    topmost_text = None
-    min_y = float('inf')
-    
-    for shape in slide.shapes:
-        if shape.has_text_frame and shape.text_frame.text:
-            # y 좌표가 가장 작은 텍스트 상자를 찾기 위해 top 속성을 비교
-            if shape.top < min_y:
-                min_y = shape.top
-                topmost_text = shape.text_frame.text.splitlines()[0]  # 첫 번째 줄만 추출
-    
-    return topmost_text  # y 좌표가 가장 작은 텍스트 상자의 첫 번째 줄 텍스트를 반환
-
-
-def extract_rectangle_size(prs):
-    """사각형 크기 추출 및 보정 전 좌표 설정"""
-    global x1_rect, y1_rect, x2_rect, y2_rect
-    rect_width = rect_height = None
-    slide = prs.slides[0]
-    for shape in slide.shapes:
-        if shape.shape_type == MSO_SHAPE_TYPE.AUTO_SHAPE and shape.auto_shape_type == MSO_AUTO_SHAPE_TYPE.RECTANGLE:
-            rect_width = shape.width
-            rect_height = shape.height
-            left = shape.left
-            top = shape.top
-            x1_rect, y1_rect = left, prs.slide_height - top
-            x2_rect, y2_rect = left + rect_width, prs.slide_height - (top + rect_height)
-            return rect_width, rect_height
-    print("오류: 사각형을 찾을 수 없습니다.")
-    
-    return None, None
-
-
-
-
-import re
-
-def extract_correction_range(prs):
-    """보정 범위 추출 - 공백 및 특수문자 제거 후 x_min, x_max, y_min, y_max 인식"""
-    global has_log10
-    x_min = y_min = x_max = y_max = None
-    slide = prs.slides[0]
-
-    for shape in slide.shapes:
-        if shape.has_text_frame and shape.text_frame.text:
-            # 모든 공백 문자(스페이스, 탭, 줄바꿈 등)를 제거
-            text = re.sub(r'\s+', '', shape.text_frame.text)
+def iter_shapes(shapes):
+    """그룹 도형 안까지 포함하여 모든 도형을 순회합니다."""
+    for shape in shapes:
+        if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            yield from iter_shapes(shape.shapes)
+        else:
+            yield shape
+
+
+class AxisTransform:
+    """
+    축 하나의 좌표 변환. 보정 사각형 변의 슬라이드 좌표 [origin, origin + length] 가
+    눈금 공간 [low, high] 에 선형으로 대응하고, 눈금 공간과 데이터 값은 scale 로 변환합니다.
+        linear: t = v,  log10: t = log10(v),  ln: t = ln(v),  reciprocal: t = 1 / v
+    모든 변환은 numpy 배열을 한 번에 처리합니다.
+    """
+    SCALES = {
+        "linear": (lambda values: values, lambda ticks: ticks),
+        "log10": (np.log10, lambda ticks: np.power(10.0, ticks)),
+        "ln": (np.log, np.exp),
+        "reciprocal": (np.reciprocal, np.reciprocal),
+    }
+
+    def __init__(self, scale, low, high, origin=0.0, length=1.0):
+        if scale not in self.SCALES:
+            raise ValueError(f"unknown axis scale {scale!r}")
+        self.scale = scale
+        self.low = low
+        self.high = high
+        self.origin = origin
+        self.length = length
+
+    def forward(self, values):
+        """데이터 값 -> 눈금 공간"""
+        return self.SCALES[self.scale][0](np.asarray(values, dtype=float))
+
+    def inverse(self, ticks):
+        """눈금 공간 -> 데이터 값"""
+        return self.SCALES[self.scale][1](np.asarray(ticks, dtype=float))
+
+    def to_data(self, slide_coords):
+        """슬라이드 좌표 배열 -> 데이터 값 배열"""
+        ticks = (np.asarray(slide_coords, dtype=float) - self.origin) / self.length * (self.high - self.low) + self.low
+        return self.inverse(ticks)
+
+    def to_slide(self, values):
+        """데이터 값 배열 -> 슬라이드 좌표 배열"""
+        return (self.forward(values) - self.low) / (self.high - self.low) * self.length + self.origin
+
+    def limits(self):
+        """사각형 양 끝의 데이터 값 (low 쪽, high 쪽)"""
+        return tuple(self.inverse([self.low, self.high]).tolist())
+
+    def apply_to_plot(self, set_scale):
+        """matplotlib 의 ax.set_xscale / ax.set_yscale 로 축 눈금을 맞춥니다."""
+        if self.scale in ("log10", "ln"):
+            set_scale('log')
+        elif self.scale == "reciprocal":
+            set_scale('function', functions=(self.forward, self.inverse))
+
+    def __repr__(self):
+        return f"AxisTransform({self.scale!r}, {self.low!r}, {self.high!r})"
+
+
+def evaluate_node(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return float(node.value)
+    if isinstance(node, ast.Name) and node.id in EXPRESSION_CONSTANTS:
+        return EXPRESSION_CONSTANTS[node.id]
+    if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+        return BINARY_OPERATORS[type(node.op)](evaluate_node(node.left), evaluate_node(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in UNARY_OPERATORS:
+        return UNARY_OPERATORS[type(node.op)](evaluate_node(node.operand))
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in EXPRESSION_FUNCTIONS
+            and len(node.args) == 1 and not node.keywords):
+        return EXPRESSION_FUNCTIONS[node.func.id](evaluate_node(node.args[0]))
+    raise ValueError(f"허용하지 않는 식입니다: {ast.dump(node)}")
+
+
+def evaluate_expression(text):
+    """
+    보정 범위 식을 계산하여 (값, 눈금 이름) 을 반환합니다. 식 전체가 log10/ln/reciprocal(...) 이면
+    눈금 이름은 그 함수 이름, 아니면 None. 허용하지 않는 식이거나 계산할 수 없으면 ValueError.
+    """
+    try:
+        tree = ast.parse(text.replace("^", "**"), mode="eval")
+        value = evaluate_node(tree.body)
+    except (SyntaxError, ArithmeticError, ValueError) as e:
+        raise ValueError(f"식을 계산할 수 없습니다: {text} ({e})")
+    body = tree.body
+    scale = None
+    if isinstance(body, ast.Call) and body.func.id in AxisTransform.SCALES:
+        scale = body.func.id
+    if not math.isfinite(value):
+        raise ValueError(f"식의 값이 유한하지 않습니다: {text}")
+    return value, scale
+
+
+def parse_axis(axis, values, scales):
+    """
+    한 축의 (눈금 이름, low, high) 를 반환합니다. low, high 는 눈금 공간 값.
+    식이 log10(...) 등이면 이미 눈금 공간 값이고, x_scale 등으로만 지정하면 데이터 값을 변환합니다.
+    """
+    low, low_scale = evaluate_expression(values[f"{axis}_min"])
+    high, high_scale = evaluate_expression(values[f"{axis}_max"])
+    inferred = {scale for scale in (low_scale, high_scale) if scale}
+    declared = scales.get(f"{axis}_scale")
+    if len(inferred) > 1 or (declared and inferred and declared not in inferred):
+        raise ValueError(f"{axis} 축의 눈금이 서로 다릅니다: {sorted(inferred | {declared} - {None})}")
+    if inferred:
+        return inferred.pop(), low, high
+    if declared:
+        low, high = AxisTransform(declared, 0, 1).forward([low, high]).tolist()
+        if not (math.isfinite(low) and math.isfinite(high)):
+            raise ValueError(f"{axis} 축 범위를 {declared} 눈금으로 변환할 수 없습니다.")
+        return declared, low, high
+    return "linear", low, high
+
+
+def parse_correction_range(text):
+    """
+    문자 상자 텍스트에서 {"x": (눈금 이름, low, high), "y": (...)} 를 추출합니다.
+    모든 공백 문자를 제거한 뒤 인식하며, 네 값이 모두 없으면 None. 식이 잘못되면 ValueError.
+    """
+    text = re.sub(r'\s+', '', text)
+    values = dict(RANGE_PATTERN.findall(text))
+    if any(key not in values for key in RANGE_KEYS):
+        return None
+    scales = dict(SCALE_PATTERN.findall(text))
+    return {axis: parse_axis(axis, values, scales) for axis in ("x", "y")}
+
+
+def extract_correction_range(range_shape, rect_left, rect_bottom, rect_width, rect_height):
+    """
+    보정 범위 추출 - 사각형 변에 대응하는 (x_axis, y_axis) AxisTransform 을 반환합니다.
+    range_shape 가 None 이면 기본값, 범위가 잘못되면 (None, None).
+    """
+    if range_shape is None:
+        print("오류: 보정 범위 값을 찾을 수 없습니다. 기본값을 사용합니다.")
+        ranges = {"x": ("log10", math.log10(1000), math.log10(30000)), "y": ("linear", 100.0, 150.0)}
+    else:
+        try:
+            ranges = parse_correction_range(range_shape.text_frame.text)
+        except ValueError as e:
+            print(f"오류: {e}")
+            return None, None
 
-            matches = re.findall(r'(x_min|x_max|y_min|y_max)=([\d.eE+-]+|log10\(\d+\))', text)
-            
-            for key, value in matches:
-                if "log10" in value:
-                    value = eval(value)  # log10 변환
-                    has_log10 = True
-                else:
-                    value = float(value)
-
-                if key == "x_min":
-                    x_min = value
-                elif key == "x_max":
-                    x_max = value
-                elif key == "y_min":
-                    y_min = value
-                elif key == "y_max":
-                    y_max = value
-
-            if x_min is not None and x_max is not None and y_min is not None and y_max is not None:
-                if x_min >= x_max:
-                    print("오류: x_min이 x_max보다 크거나 같습니다. 보정 범위를 확인하세요.")
-                    return None, None, None, None
-                if y_min >= y_max:
-                    print("오류: y_min이 y_max보다 크거나 같습니다. 보정 범위를 확인하세요.")
-                    return None, None, None, None
-
-                return x_min, y_min, x_max, y_max
-
-    print("오류: 보정 범위 값을 찾을 수 없습니다. 기본값을 사용합니다.")
-    x_min, y_min, x_max, y_max = log10(1000), 100, log10(30000), 150
-    has_log10 = True  # 기본값에 log10 포함
-    return x_min, y_min, x_max, y_max
-
-
-
-
-def process_line_shape(shape, slide_height, rect_width, rect_height, x_min, y_min, x_max, y_max, line_coordinates):
-    """개별 선 도형을 처리하여 보정합니다."""
-    global x1_rect, y1_rect, x2_rect, y2_rect
+    x_axis = AxisTransform(*ranges["x"], origin=rect_left, length=rect_width)
+    y_axis = AxisTransform(*ranges["y"], origin=rect_bottom, length=rect_height)
+    # 순서는 데이터 값으로 확인 (reciprocal 눈금은 눈금 공간에서 순서가 뒤집힘)
+    x_min, x_max = x_axis.limits()
+    if x_min >= x_max:
+        print("오류: x_min이 x_max보다 크거나 같습니다. 보정 범위를 확인하세요.")
+        return None, None
+    y_min, y_max = y_axis.limits()
+    if y_min >= y_max:
+        print("오류: y_min이 y_max보다 크거나 같습니다. 보정 범위를 확인하세요.")
+        return None, None
+    return x_axis, y_axis
+
+
+def is_range_shape(shape):
+    if not shape.has_text_frame:
+        return False
+    keys = {key for key, _ in RANGE_PATTERN.findall(re.sub(r'\s+', '', shape.text_frame.text))}
+    return all(key in keys for key in RANGE_KEYS)
+
+
+def is_calibration_rectangle(shape):
+    return (shape.shape_type == MSO_SHAPE_TYPE.AUTO_SHAPE and shape.auto_shape_type == MSO_AUTO_SHAPE_TYPE.RECTANGLE
+            and not is_range_shape(shape))
+
+
+def center_distance(shape1, shape2):
+    return math.hypot(shape1.left + shape1.width / 2 - shape2.left - shape2.width / 2,
+                      shape1.top + shape1.height / 2 - shape2.top - shape2.height / 2)
+
+
+def contains_center(rect, shape):
+    center_x, center_y = shape.left + shape.width / 2, shape.top + shape.height / 2
+    return rect.left <= center_x <= rect.left + rect.width and rect.top <= center_y <= rect.top + rect.height
+
+
+def pair_range_shapes(rectangles, range_shapes):
+    """
+    사각형마다 보정 범위 문자 상자를 하나씩 짝지어 사각형 순서의 리스트로 반환합니다 (짝이 없으면 None).
+    중심이 사각형 안에 있는 문자 상자를 먼저, 그다음 중심 거리가 가까운 순으로 짝짓고, 문자 상자는 한 번만 씁니다.
+    """
+    candidates = sorted((not contains_center(rect, shape), center_distance(shape, rect), rect_index, shape_index)
+                        for rect_index, rect in enumerate(rectangles)
+                        for shape_index, shape in enumerate(range_shapes))
+    pairs = [None] * len(rectangles)
+    used = set()
+    for _, _, rect_index, shape_index in candidates:
+        if pairs[rect_index] is None and shape_index not in used:
+            pairs[rect_index] = range_shapes[shape_index]
+            used.add(shape_index)
+    return pairs
+
+
+def extract_title(rect, text_shapes):
+    """
+    사각형 위에 있고 가로로 겹치는 텍스트 상자 중 가장 가까운 것의 첫 번째 줄을 제목으로 사용합니다.
+    없으면 슬라이드에서 y 좌표가 가장 작은 텍스트 상자의 첫 번째 줄을 사용합니다.
+    """
+    above = [shape for shape in text_shapes
+             if shape.top + shape.height <= rect.top
+             and shape.left < rect.left + rect.width and shape.left + shape.width > rect.left]
+    if above:
+        title_shape = max(above, key=lambda shape: shape.top + shape.height)
+    elif text_shapes:
+        title_shape = min(text_shapes, key=lambda shape: shape.top)
+    else:
+        return None
+    return title_shape.text_frame.text.splitlines()[0]  # 첫 번째 줄만 추출
+
+
+def find_plot_regions(slide, slide_number, slide_height):
+    """
+    슬라이드의 사각형마다 짝이 되는 보정 범위 문자 상자와 제목을 찾아 PlotRegion 리스트를 반환합니다.
+    보정 범위 문자 상자와 짝지을 수 없는 사각형은 경고를 출력하고 건너뜁니다.
+    """
+    shapes = list(iter_shapes(slide.shapes))
+    rectangles = [shape for shape in shapes if is_calibration_rectangle(shape)]
+    range_shapes = [shape for shape in shapes if is_range_shape(shape)]
+    text_shapes = [shape for shape in shapes
+                   if shape.has_text_frame and shape.text_frame.text.strip()
+                   and shape not in range_shapes and shape not in rectangles]
+
+    regions = []
+    # 사각형이 하나뿐이고 보정 범위 문자 상자가 없으면 기본값 사용 (extract_correction_range)
+    use_default = len(rectangles) == 1 and not range_shapes
+    for rect, range_shape in zip(rectangles, pair_range_shapes(rectangles, range_shapes)):
+        if range_shape is None and not use_default:
+            print(f"경고: 슬라이드 {slide_number}의 사각형 '{rect.name}'에 대응하는 보정 범위 문자 상자가 없어 건너뜁니다.")
+            continue
+        bottom = slide_height - (rect.top + rect.height)
+        x_axis, y_axis = extract_correction_range(range_shape, rect.left, bottom, rect.width, rect.height)
+        regions.append(PlotRegion(slide_number, len(regions), rect.left, bottom, rect.width, rect.height,
+                                  x_axis, y_axis, extract_title(rect, text_shapes)))
+    return regions
+
+
+def contains_rectangle(shapes):
+    return any(is_calibration_rectangle(shape) for shape in iter_shapes(shapes))
+
+
+def line_color_key(shape):
+    """선 색상을 곡선 이름으로 사용 (RGB 는 #RRGGBB, 테마 색상은 테마 이름)."""
+    try:
+        color = shape.line.color
+        if color.type == MSO_COLOR_TYPE.RGB:
+            return f"#{color.rgb}"
+        if color.type == MSO_COLOR_TYPE.SCHEME:
+            return str(color.theme_color)
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return "default"
+
+
+def line_top_point(shape, slide_height):
+    """x축 크기가 0인 선이면 위쪽 끝점 (x, y) 를, 아니면 None 을 반환합니다."""
     left = shape.left
     top = shape.top
     width = shape.width
@@ -156,88 +360,205 @@ def process_line_shape(shape, slide_height, rect_width, rect_height, x_min, y_mi
     end_x, end_y = left + width, slide_height - (top + height)
 
     if start_x == end_x:
-        x_line = max(start_x, end_x)
-        y_line = max(start_y, end_y)
-        x0_rect = min(x1_rect, x2_rect)
-        y0_rect = min(y1_rect, y2_rect)
-        
-        if rect_width and rect_height and x_min is not None and y_min is not None and x_max is not None and y_max is not None:
-            corrected_x = (x_line - x0_rect) / rect_width * (x_max - x_min) + x_min
-            corrected_y = (y_line - y0_rect) / rect_height * (y_max - y_min) + y_min
-            line_coordinates.append((corrected_x, corrected_y))
+        return max(start_x, end_x), max(start_y, end_y)
+    return None
 
 
-def process_shapes(shapes, slide_height, rect_width, rect_height, x_min, y_min, x_max, y_max):
-    """슬라이드의 도형을 처리하며 그룹 도형도 포함합니다."""
-    line_coordinates = []
+def collect_line_points(shapes, slide_height, curve=None):
+    """
+    슬라이드의 도형을 처리하며 그룹 도형도 포함합니다. 유효 화살표마다 (곡선 이름, x, y) 를 반환합니다.
+    그래프 사각형을 포함하지 않는 그룹은 그룹 이름이 곡선 이름이고, 그룹 밖의 화살표는 선 색상이 곡선 이름입니다.
+    """
+    points = []
     for shape in shapes:
         if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
-            line_coordinates.extend(process_shapes(shape.shapes, slide_height, rect_width, rect_height, x_min, y_min, x_max, y_max))
+            group_curve = curve if contains_rectangle(shape.shapes) else shape.name
+            points.extend(collect_line_points(shape.shapes, slide_height, group_curve))
         elif shape.shape_type == MSO_SHAPE_TYPE.LINE:
-            process_line_shape(shape, slide_height, rect_width, rect_height, x_min, y_min, x_max, y_max, line_coordinates)
-    return line_coordinates
-
+            point = line_top_point(shape, slide_height)
+            if point:
+                points.append((curve or line_color_key(shape),) + point)
+    return points
+
+
+def nearest_region(regions, x, y):
+    """점을 포함하는 그래프 영역, 없으면 가장 가까운 영역을 반환합니다."""
+    def distance(region):
+        dx = max(region.left - x, 0, x - (region.left + region.width))
+        dy = max(region.bottom - y, 0, y - (region.bottom + region.height))
+        return math.hypot(dx, dy)
+    return min(regions, key=distance)
+
+
+def digitize_slide(slide, slide_number, slide_height):
+    """
+    슬라이드 하나의 (그래프 영역 리스트, DigitizedCurve 리스트) 를 반환합니다.
+    곡선은 그래프 순서, 같은 그래프 안에서는 처음 나온 순서입니다.
+    """
+    regions = find_plot_regions(slide, slide_number, slide_height)
+    if not regions:
+        print(f"슬라이드 {slide_number}: 사각형을 찾을 수 없어 건너뜁니다.")
+        return [], []
+
+    curve_points = {}
+    for curve, x_line, y_line in collect_line_points(slide.shapes, slide_height):
+        region = nearest_region(regions, x_line, y_line)
+        if region.x_axis is None:
+            continue
+        curve_points.setdefault((region.index, curve), []).append((x_line, y_line))
+
+    curves = []
+    for (region_index, curve), coords in sorted(curve_points.items(), key=lambda item: item[0][0]):
+        coords.sort(key=lambda coord: coord[0])
+        x_line, y_line = np.array(coords, dtype=float).T
+        region = regions[region_index]
+        curves.append(DigitizedCurve(slide_number, region_index, curve,
+                                     region.x_axis.to_data(x_line), region.y_axis.to_data(y_line)))
+    return regions, curves
+
+
+def digitize_presentation(prs):
+    """모든 슬라이드를 처리하여 (그래프 영역 리스트, DigitizedCurve 리스트) 를 반환합니다. 슬라이드 번호는 1부터."""
+    regions = []
+    curves = []
+    for slide_number, slide in enumerate(prs.slides, 1):
+        slide_regions, slide_curves = digitize_slide(slide, slide_number, prs.slide_height)
+        regions.extend(slide_regions)
+        curves.extend(slide_curves)
+    return regions, curves
+
+
+def curves_to_dataset(curves):
+    """DigitizedCurve 리스트를 DATASET_DTYPE 구조화 배열 하나로 합칩니다."""
+    dataset = np.empty(sum(len(curve.x) for curve in curves), dtype=DATASET_DTYPE)
+    start = 0
+    for curve in curves:
+        end = start + len(curve.x)
+        dataset["slide"][start:end] = curve.slide
+        dataset["region"][start:end] = curve.region
+        dataset["curve"][start:end] = curve.curve
+        dataset["x"][start:end] = curve.x
+        dataset["y"][start:end] = curve.y
+        start = end
+    return dataset
+
+
+def interpolate_curve(x_values, y_values, x_axis, y_axis, num=INTERPOLATION_POINTS):
+    """
+    데이터 좌표를 눈금 공간으로 옮겨 중복된 x 좌표를 제거하고(처음 값 유지) B-spline 보간합니다.
+    실패하면 선형 보간. 결과는 다시 데이터 좌표인 (x_coords, y_coords, x_new, y_new) 이며,
+    좌표가 2개 미만이면 x_new, y_new 는 None.
+    """
+    x_coords, first = np.unique(x_axis.forward(x_values), return_index=True)
+    y_coords = y_axis.forward(y_values)[first]
+    if len(x_coords) < 2:
+        return x_axis.inverse(x_coords), y_axis.inverse(y_coords), None, None
 
-
-def plot_interpolated_coordinates(line_coordinates, x_min, x_max, y_min, y_max, title=None, has_log10=False):
-    """자유 형식 보간법을 사용하여 추출된 좌표 데이터를 그래프로 플롯합니다."""
-    if len(line_coordinates) < 2:
-        print("오류: 보간을 수행하기에 충분한 좌표가 없습니다.")
-        return
-    
-    # 중복된 x 좌표 제거
-    unique_coordinates = {}
-    for coord in line_coordinates:
-        if coord[0] not in unique_coordinates:
-            unique_coordinates[coord[0]] = coord[1]
-    
-    # x 기준으로 정렬
-    x_coords = sorted(unique_coordinates.keys())
-    y_coords = [unique_coordinates[x] for x in x_coords]
-    
-    # 보간 처리
     try:
         from scipy.interpolate import make_interp_spline, interp1d
-        
+
         spline_interpolator = make_interp_spline(x_coords, y_coords, k=3)
-        x_new = np.linspace(min(x_coords), max(x_coords), num=500)
+        x_new = np.linspace(x_coords[0], x_coords[-1], num=num)
         y_new = spline_interpolator(x_new)
     except ValueError:
         interpolator = interp1d(x_coords, y_coords, kind='linear')
-        x_new = np.linspace(min(x_coords), max(x_coords), num=500)
+        x_new = np.linspace(x_coords[0], x_coords[-1], num=num)
         y_new = interpolator(x_new)
-    
+    return x_axis.inverse(x_coords), y_axis.inverse(y_coords), x_axis.inverse(x_new), y_axis.inverse(y_new)
+
+
+def region_curves(curves, region):
+    return [curve for curve in curves if curve.slide == region.slide and curve.region == region.index]
+
+
+def interpolate_curves(curves, x_axis, y_axis, num=INTERPOLATION_POINTS):
+    """
+    그래프 하나의 곡선들을 보간하여 (원본 곡선 리스트, 보간 곡선 리스트) 를 DigitizedCurve 로 반환합니다.
+    원본은 중복 x 를 제거한 좌표이며, 좌표가 부족한 곡선은 제외합니다.
+    """
+    originals = []
+    interpolated = []
+    for curve in curves:
+        x_coords, y_coords, x_new, y_new = interpolate_curve(curve.x, curve.y, x_axis, y_axis, num)
+        if x_new is None:
+            print(f"오류: 곡선 {curve.curve} 은 보간을 수행하기에 충분한 좌표가 없습니다.")
+            continue
+        originals.append(curve._replace(x=x_coords, y=y_coords))
+        interpolated.append(curve._replace(x=x_new, y=y_new))
+    return originals, interpolated
+
+
+def format_rows(curves):
+    """DigitizedCurve 리스트를 탭 구분 텍스트로 만듭니다. 곡선이 여러 개면 첫 열이 곡선 이름."""
+    if len(curves) == 1:
+        return "\n".join(f"{x:.3e}\t{y:.3e}" for x, y in zip(curves[0].x, curves[0].y))
+    return "\n".join(f"{curve.curve}\t{x:.3e}\t{y:.3e}" for curve in curves for x, y in zip(curve.x, curve.y))
+
+
+def draw_curves(ax, originals, interpolated, x_axis, y_axis, title=None):
+    """원본 좌표와 보간 곡선을 matplotlib 축 하나에 그립니다."""
     # 특수문자 제거 (Glyph 9 오류 방지)
     title = re.sub(r'[^\x20-\x7E]', '', title) if title else None
-    
-    root = tk.Tk()
-    root.title("Interpolated Coordinate Graph")
-    root.protocol("WM_DELETE_WINDOW", root.quit)
-    
-    if has_log10:
-        x_new = [10 ** x for x in x_new]
-        x_coords = [10 ** x for x in x_coords]
-        x_min, x_max = 10 ** x_min, 10 ** x_max
 
-    # 그래프 생성
-    fig, ax = plt.subplots()
-    ax.plot(x_coords, y_coords, 'ro', label='Original Data')
-    ax.plot(x_new, y_new, 'b.', label='B-spline Interpolated Data', markersize=2)
-    ax.set_xlim(x_min, x_max)
-    ax.set_ylim(y_min, y_max)
-    
-    if has_log10:
-        ax.set_xscale('log')
-        
+    multiple = len(originals) > 1
+    for i, (original, curve) in enumerate(zip(originals, interpolated)):
+        prefix = f"{curve.curve} " if multiple else ""
+        ax.plot(original.x, original.y, 'o', color=f"C{i}" if multiple else "r", label=prefix + 'Original Data')
+        ax.plot(curve.x, curve.y, '.', color=f"C{i}" if multiple else "b", label=prefix + 'B-spline Interpolated Data',
+                markersize=2)
+    x_axis.apply_to_plot(ax.set_xscale)
+    y_axis.apply_to_plot(ax.set_yscale)
+    ax.set_xlim(*x_axis.limits())
+    ax.set_ylim(*y_axis.limits())
+
     ax.set_xlabel("X Coordinate")
     ax.set_ylabel("Y Coordinate")
-    
+
     if title:
         ax.set_title(title)
-    
+
     ax.grid()
     ax.legend()
-    
+
+
+def save_plot_png(path, originals, interpolated, x_axis, y_axis, title=None):
+    """화면 없이 Agg 캔버스로 그래프를 PNG 로 저장합니다."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    draw_curves(fig.add_subplot(), originals, interpolated, x_axis, y_axis, title)
+    fig.savefig(path)
+
+
+def write_csv(path, dataset):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(DATASET_DTYPE.names)
+        writer.writerows(dataset.tolist())
+
+
+def plot_interpolated_coordinates(curves, x_axis, y_axis, title=None):
+    """자유 형식 보간법을 사용하여 그래프 하나의 곡선들을 플롯합니다."""
+    import tkinter as tk
+    import matplotlib.pyplot as plt
+    import win32clipboard
+    from PIL import Image
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+    originals, interpolated = interpolate_curves(curves, x_axis, y_axis)
+    if not originals:
+        return
+
+    root = tk.Tk()
+    root.title("Interpolated Coordinate Graph")
+    root.protocol("WM_DELETE_WINDOW", root.quit)
+
+    # 그래프 생성
+    fig, ax = plt.subplots()
+    draw_curves(ax, originals, interpolated, x_axis, y_axis, title)
+
     # 그래프를 Tkinter에 표시
     canvas = FigureCanvasTkAgg(fig, master=root)
     canvas.draw()
@@ -249,14 +570,14 @@ def plot_interpolated_coordinates(line_coordinates, x_min, x_max, y_min, y_max,
 
     # 원본 데이터 복사 기능
     def copy_original_data():
-        data = "\n".join(f"{x:.3e}\t{y:.3e}" for x, y in zip(x_coords, y_coords))
+        data = format_rows(originals)
         root.clipboard_clear()
         root.clipboard_append(data)
         root.update()
 
     # 보간된 좌표 데이터 복사 기능
     def copy_text_to_clipboard():
-        data = "\n".join(f"{x:.3e}\t{y:.3e}" for x, y in zip(x_new, y_new))
+        data = format_rows(interpolated)
         win32clipboard.OpenClipboard()
         win32clipboard.EmptyClipboard()
         win32clipboard.SetClipboardText(data, win32clipboard.CF_TEXT)
@@ -272,7 +593,7 @@ def plot_interpolated_coordinates(line_coordinates, x_min, x_max, y_min, y_max,
         image.convert("RGB").save(output, "BMP")
         data = output.getvalue()[14:]  # BMP 헤더 제거
         output.close()
-        
+
         win32clipboard.OpenClipboard()
         win32clipboard.EmptyClipboard()
         win32clipboard.SetClipboardData(win32clipboard.CF_DIB, data)
@@ -285,64 +606,136 @@ def plot_interpolated_coordinates(line_coordinates, x_min, x_max, y_min, y_max,
     tk.Button(frame, text="닫기", command=root.quit, bg="red", fg="white").grid(row=0, column=3, padx=5, pady=5)
 
     root.mainloop()
+    root.destroy()
+    plt.close(fig)
 
 
-def display_correction_values(x_min, x_max, y_min, y_max):
+def display_correction_values(x_axis, y_axis):
     """보정 범위 값을 텍스트로 출력하는 함수"""
-    print(f"x_min = {x_min}")
-    print(f"x_max = {x_max}")
-    print(f"y_min = {y_min}")
-    print(f"y_max = {y_max}")
-    
+    for name, axis in (("x", x_axis), ("y", y_axis)):
+        if axis is None:
+            print(f"{name}_min = None")
+            print(f"{name}_max = None")
+            continue
+        data_min, data_max = axis.limits()
+        print(f"{name}_min = {axis.low} ({axis.scale}, {data_min:g})")
+        print(f"{name}_max = {axis.high} ({axis.scale}, {data_max:g})")
+
 
 def main(ppt_file):
     # 코드 설명서 화면에 프린트
     print(DESCRIPTION)
-    
+
     _, ext = os.path.splitext(ppt_file)
     if ext.lower() != ".pptx":
         print("오류: 지원되지 않는 파일 형식입니다. .pptx 파일을 사용하세요.")
-        
+
         return
-    
+
     prs, temp_file = open_presentation(ppt_file)
     if prs is None:
         return
-    
+
     try:
-        title = extract_title_from_ppt(prs)
-        
-        rect_width, rect_height = extract_rectangle_size(prs)
-        if rect_width is None or rect_height is None:
-            print("오류: 사각형 크기가 설정되지 않았습니다.")
-            
-            return
-        
-        x_min, y_min, x_max, y_max = extract_correction_range(prs)
-        #화면에 표시
-        display_correction_values(x_min, x_max, y_min, y_max)
-            
-        if x_min is None or y_min is None or x_max is None or y_max is None:
-            print("오류: 보정 범위 값이 없습니다.")
-            
-            return
-        
-        slide = prs.slides[0]
-        line_coordinates = process_shapes(slide.shapes, prs.slide_height, rect_width, rect_height, x_min, y_min, x_max, y_max)
-        line_coordinates.sort(key=lambda coord: coord[0])
-        
-        plot_interpolated_coordinates(line_coordinates, x_min, x_max, y_min, y_max, title=title)
-    
+        regions, curves = digitize_presentation(prs)
+        dataset = curves_to_dataset(curves)
+        print(f"{len(prs.slides)}개 슬라이드, {len(regions)}개 그래프, {len(curves)}개 곡선, {len(dataset)}개 좌표를 추출했습니다.")
+
+        for region in regions:
+            print(f"\n슬라이드 {region.slide} 그래프 {region.index + 1}: {region.title}")
+            #화면에 표시
+            display_correction_values(region.x_axis, region.y_axis)
+            if region.x_axis is None:
+                print("오류: 보정 범위 값이 없습니다.")
+                continue
+
+            curves_in_region = region_curves(curves, region)
+            if not curves_in_region:
+                print("오류: 유효 화살표가 없습니다.")
+                continue
+            plot_interpolated_coordinates(curves_in_region, region.x_axis, region.y_axis, title=region.title)
+
     finally:
         if temp_file and os.path.exists(temp_file):
             os.remove(temp_file)
             print("임시 파일이 삭제되었습니다.")
 
 
+def digitize(ppt_file, output_dir=None, formats=EXPORT_FORMATS, num=INTERPOLATION_POINTS):
+    """
+    창 없이 pptx 파일 하나를 처리하여 DigitizeResult 를 반환합니다. (Tk, win32 불필요)
+    output_dir 를 주면 formats 에 따라 <이름>_raw.csv, <이름>_interpolated.csv, <이름>.npz (raw, interpolated),
+    그래프마다 <이름>_s<슬라이드>_g<그래프>.png 를 저장합니다.
+    파일 형식이 잘못되면 ValueError, 열 수 없으면 OSError.
+    """
+    _, ext = os.path.splitext(ppt_file)
+    if ext.lower() != ".pptx":
+        raise ValueError(f"지원되지 않는 파일 형식입니다. .pptx 파일을 사용하세요: {ppt_file}")
+
+    prs, temp_file = open_presentation(ppt_file)
+    if prs is None:
+        raise OSError(f"프레젠테이션 파일을 열 수 없습니다: {ppt_file}")
+    try:
+        regions, curves = digitize_presentation(prs)
+    finally:
+        if temp_file and os.path.exists(temp_file):
+            os.remove(temp_file)
+
+    interpolated = []
+    plots = []
+    for region in regions:
+        if region.x_axis is None:
+            continue
+        originals, region_interpolated = interpolate_curves(region_curves(curves, region),
+                                                            region.x_axis, region.y_axis, num)
+        interpolated.extend(region_interpolated)
+        if originals:
+            plots.append((region, originals, region_interpolated))
+    raw = curves_to_dataset(curves)
+    interpolated = curves_to_dataset(interpolated)
+
+    files = []
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        stem = os.path.join(output_dir, os.path.splitext(os.path.basename(ppt_file))[0])
+        if "csv" in formats:
+            write_csv(stem + "_raw.csv", raw)
+            write_csv(stem + "_interpolated.csv", interpolated)
+            files += [stem + "_raw.csv", stem + "_interpolated.csv"]
+        if "npz" in formats:
+            np.savez(stem + ".npz", raw=raw, interpolated=interpolated)
+            files.append(stem + ".npz")
+        if "png" in formats:
+            for region, originals, region_interpolated in plots:
+                path = f"{stem}_s{region.slide}_g{region.index + 1}.png"
+                save_plot_png(path, originals, region_interpolated, region.x_axis, region.y_axis, region.title)
+                files.append(path)
+    return DigitizeResult(regions, raw, interpolated, files)
+
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("사용법: python script.py <ppt_file>")
-    else:
-        ppt_file = sys.argv[1]
+    parser = argparse.ArgumentParser(description="PPT 그래프 화살표 좌표 추출")
+    parser.add_argument("ppt_files", nargs="+", help="pptx 파일 경로 (여러 개 가능)")
+    parser.add_argument("--headless", action="store_true", help="창 없이 CSV/NPZ/PNG 파일로 저장")
+    parser.add_argument("--output-dir", help="헤드리스 출력 폴더 (기본값: 각 pptx 파일이 있는 폴더)")
+    parser.add_argument("--format", nargs="+", choices=EXPORT_FORMATS, default=list(EXPORT_FORMATS),
+                        help="헤드리스 출력 형식")
+    args = parser.parse_args()
+
+    failed = False
+    for ppt_file in args.ppt_files:
         print(f"입력 파일: {ppt_file}")
-        main(ppt_file)
+        if not args.headless:
+            main(ppt_file)
+            continue
+        try:
+            result = digitize(ppt_file, args.output_dir or os.path.dirname(os.path.abspath(ppt_file)), args.format)
+        except (ValueError, OSError) as e:
+            print(f"오류: {e}")
+            failed = True
+            continue
+        print(f"{len(result.regions)}개 그래프, 원본 {len(result.raw)}개, 보간 {len(result.interpolated)}개 좌표")
+        for path in result.files:
+            print(f"저장: {path}")
+    if failed:
+        sys.exit(1)
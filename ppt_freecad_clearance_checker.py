@@ -0,0 +1,149 @@
+'''
+ppt_freecad.txt 의 D 프리미티브끼리 겹침/최소 간격 검사 (FreeCAD 불필요).
+
+D 바디는 N 으로만 잘리고 서로 검사하지 않으므로, 여기서 D 끼리의 간섭을 찾습니다.
+XY 박스를 clearance 만큼 넓혀 sweep-and-prune 으로 후보 쌍만 고른 뒤,
+후보마다 회전 사각형/원의 정확한 XY 거리와 z 구간 겹침을 검사합니다.
+N 으로 잘리는 부분은 고려하지 않으므로 결과는 보수적입니다.
+
+    python ppt_freecad_clearance_checker.py ppt_freecad.txt --clearance 0.2
+'''
+import sys
+import json
+import math
+import time
+import argparse
+
+from ppt_freecad_voxel_estimator import load_solids
+from ppt_freecad_spatial import rect_corners, sweep_and_prune_pairs
+
+INPUT_FILE = r"C:\tmp_freecad\ppt_freecad.txt"
+CLEARANCE = 0.0  # 최소 간격 (mm). 0 이면 실제로 겹치는 쌍만 보고
+TOLERANCE = 1e-9  # 경계 접촉을 겹침으로 보지 않기 위한 허용 오차
+
+
+def point_segment_distance(point, start, end):
+    px, py = point[0] - start[0], point[1] - start[1]
+    ex, ey = end[0] - start[0], end[1] - start[1]
+    length_sq = ex * ex + ey * ey
+    t = 0.0 if length_sq == 0 else max(0.0, min(1.0, (px * ex + py * ey) / length_sq))
+    return math.hypot(px - t * ex, py - t * ey)
+
+
+def polygon_edges(corners):
+    return list(zip(corners, corners[1:] + corners[:1]))
+
+
+def separation_along_axes(corners1, corners2):
+    """
+    두 볼록 다각형의 분리축(각 변의 법선) 별 간격 중 최댓값.
+    양수면 분리, 0 이하면 겹침이며 그 크기는 최소 이동 거리(관통 깊이).
+    """
+    best = -math.inf
+    for corners in (corners1, corners2):
+        for (x1, y1), (x2, y2) in polygon_edges(corners):
+            nx, ny = y2 - y1, x1 - x2
+            length = math.hypot(nx, ny)
+            nx, ny = nx / length, ny / length
+            proj1 = [x * nx + y * ny for x, y in corners1]
+            proj2 = [x * nx + y * ny for x, y in corners2]
+            best = max(best, max(min(proj2) - max(proj1), min(proj1) - max(proj2)))
+    return best
+
+
+def rect_rect_distance(params1, params2):
+    corners1, corners2 = rect_corners(*params1), rect_corners(*params2)
+    separation = separation_along_axes(corners1, corners2)
+    if separation <= 0:
+        return separation
+    # 분리된 경우: 꼭짓점과 상대 변 사이 거리의 최솟값이 정확한 거리
+    return min(min(point_segment_distance(point, start, end) for point in points for start, end in polygon_edges(edges))
+               for points, edges in ((corners1, corners2), (corners2, corners1)))
+
+
+def rect_circle_distance(rect_params, circle_params):
+    cx, cy, x_size, y_size, angle = rect_params
+    px, py, radius = circle_params
+    # 원 중심을 사각형의 로컬 좌표로 옮김
+    rad = math.radians(angle)
+    cos_a, sin_a = math.cos(rad), math.sin(rad)
+    dx, dy = px - cx, py - cy
+    u, v = abs(dx * cos_a + dy * sin_a), abs(-dx * sin_a + dy * cos_a)
+    out_u, out_v = u - x_size / 2, v - y_size / 2
+    if out_u <= 0 and out_v <= 0:
+        return max(out_u, out_v) - radius
+    return math.hypot(max(out_u, 0.0), max(out_v, 0.0)) - radius
+
+
+def signed_distance(solid1, solid2):
+    """
+    두 도형 XY 단면 사이의 부호 있는 거리 (mm). 양수는 간격, 음수는 관통 깊이.
+    """
+    if solid1.shape_type == "CIRCLE" and solid2.shape_type == "CIRCLE":
+        x1, y1, r1 = solid1.params
+        x2, y2, r2 = solid2.params
+        return math.hypot(x2 - x1, y2 - y1) - r1 - r2
+    if solid1.shape_type == "CIRCLE":
+        solid1, solid2 = solid2, solid1
+    if solid2.shape_type == "CIRCLE":
+        return rect_circle_distance(solid1.params, solid2.params)
+    return rect_rect_distance(solid1.params, solid2.params)
+
+
+def z_overlap(box1, box2):
+    return min(box1[5], box2[5]) - max(box1[4], box2[4])
+
+
+def check_clearance(solids, clearance=CLEARANCE):
+    """
+    solids 중 z 구간이 겹치고 XY 거리가 clearance 보다 작은 쌍을
+    [{"lines": (줄 번호, 줄 번호), "distance": 부호 있는 거리, "z_range": (z 시작, z 끝)}] 로 반환.
+    """
+    half = clearance / 2
+    boxes = [(box[0] - half, box[1] + half, box[2] - half, box[3] + half, box[4], box[5])
+             for box in (solid.box for solid in solids)]
+    violations = []
+    for i, j in sweep_and_prune_pairs(boxes):
+        solid1, solid2 = solids[i], solids[j]
+        if z_overlap(solid1.box, solid2.box) <= TOLERANCE:
+            continue
+        distance = signed_distance(solid1, solid2)
+        if distance < clearance - TOLERANCE:
+            violations.append({"lines": tuple(sorted((solid1.line_number, solid2.line_number))),
+                               "distance": distance,
+                               "z_range": (max(solid1.box[4], solid2.box[4]), min(solid1.box[5], solid2.box[5]))})
+    violations.sort(key=lambda violation: violation["lines"])
+    return violations
+
+
+def format_violations(violations):
+    lines = []
+    for violation in violations:
+        kind = "overlap" if violation["distance"] < TOLERANCE else "clearance"
+        lines.append("line {} <-> line {}: {} {:.4f} mm (z {:.3f}~{:.3f})".format(
+            *violation["lines"], kind, violation["distance"], *violation["z_range"]))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ppt_freecad.txt D 프리미티브 겹침/최소 간격 검사")
+    parser.add_argument("input_file", nargs="?", default=INPUT_FILE, help="ppt_freecad.txt 경로")
+    parser.add_argument("--clearance", type=float, default=CLEARANCE, help="최소 간격 (mm)")
+    parser.add_argument("--json", help="결과를 JSON 으로 저장할 경로")
+    args = parser.parse_args()
+    if args.clearance < 0:
+        parser.error("--clearance must not be negative")
+
+    start = time.perf_counter()
+    D_solids = [solid for solid in load_solids(args.input_file) if solid.body_type == "D"]
+    violations = check_clearance(D_solids, args.clearance)
+    elapsed = time.perf_counter() - start
+    print(f"Checked {len(D_solids)} D primitives in {elapsed * 1000:.1f} ms (clearance {args.clearance} mm)")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"clearance": args.clearance, "violations": violations}, f, indent=2)
+        print(f"Saved {args.json}")
+    if violations:
+        print(f"{len(violations)} violations:")
+        print(format_violations(violations))
+        sys.exit(1)
@@ -0,0 +1,130 @@
+'''
+freecad_macro.py 최종 솔리드의 메쉬 파일 쓰기 (바이너리 STL, 3MF).
+
+FreeCAD 없이 numpy 배열 (points: (n, 3) float, facets: (m, 3) int) 만 받으며,
+바디 하나씩 파일에 바로 기록하므로 전체 메쉬를 메모리에 모으지 않습니다.
+'''
+import struct
+import zipfile
+from xml.sax.saxutils import quoteattr
+
+import numpy as np
+
+# 바이너리 STL 삼각형 레코드 (리틀 엔디언, 50 바이트)
+STL_RECORD = np.dtype([("normal", "<f4", (3,)), ("vertices", "<f4", (3, 3)), ("attribute", "<u2")])
+
+THREEMF_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>'
+    '</Types>')
+THREEMF_RELS = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Target="/3D/3dmodel.model" Id="rel0" '
+    'Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>'
+    '</Relationships>')
+
+
+def stl_color(color):
+    """
+    (R, G, B) 0~1 색상 (또는 (m, 3) 삼각형별 색상 배열) 을 VisCAM/SolidView 규칙의 삼각형 속성값으로 변환
+    (bit 15 = 색상 유효, bit 10~14 빨강, 5~9 초록, 0~4 파랑).
+    """
+    rgb = np.clip(np.rint(np.asarray(color, dtype=float) * 31), 0, 31).astype(np.uint16)
+    return 0x8000 | (rgb[..., 0] << 10) | (rgb[..., 1] << 5) | rgb[..., 2]
+
+
+def hex_color(color):
+    return "#" + "".join(f"{min(255, max(0, int(round(channel * 255)))):02X}" for channel in color)
+
+
+class BinaryStlWriter:
+    """
+    바이너리 STL 을 바디 단위로 이어 쓰고, close 할 때 헤더의 삼각형 수를 채움.
+    """
+
+    def __init__(self, path):
+        self.f = open(path, "wb")
+        self.f.write(b"ppt_freecad binary STL".ljust(80, b" "))
+        self.f.write(struct.pack("<I", 0))
+        self.triangle_count = 0
+
+    def add(self, points, facets, color):
+        """
+        color 는 바디 전체의 (R, G, B) 또는 facets 와 같은 길이의 (m, 3) 삼각형별 색상 배열.
+        """
+        triangles = np.asarray(points, dtype=np.float64)[np.asarray(facets, dtype=np.int64)]
+        normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+        records = np.empty(len(triangles), dtype=STL_RECORD)
+        records["normal"] = normals
+        records["vertices"] = triangles
+        records["attribute"] = stl_color(color)
+        self.f.write(records.tobytes())
+        self.triangle_count += len(records)
+
+    def close(self):
+        self.f.seek(80)
+        self.f.write(struct.pack("<I", self.triangle_count))
+        self.f.close()
+
+
+class ThreeMFWriter:
+    """
+    3MF 패키지를 바디 단위로 이어 씀. 바디마다 object 하나이며,
+    색상은 basematerials 그룹(id 1)의 displaycolor 로 지정.
+    colors 는 add 에서 인덱스로 참조할 색상 리스트 (object 기본 색상과 삼각형별 색상 모두).
+    """
+
+    def __init__(self, path, colors):
+        self.zip_file = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+        self.zip_file.writestr("[Content_Types].xml", THREEMF_CONTENT_TYPES)
+        self.zip_file.writestr("_rels/.rels", THREEMF_RELS)
+        self.model = self.zip_file.open("3D/3dmodel.model", "w")
+        self.object_ids = []
+        self.material_count = len(colors)
+        self.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                   '<model unit="millimeter" xml:lang="en-US" '
+                   'xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">\n'
+                   '<resources>\n<basematerials id="1">\n')
+        for index, color in enumerate(colors):
+            self.write(f'<base name="color_{index + 1}" displaycolor="{hex_color(color)}"/>\n')
+        self.write('</basematerials>\n')
+
+    def write(self, text):
+        self.model.write(text.encode("utf-8"))
+
+    def add(self, points, facets, material_index, name, triangle_materials=None):
+        """
+        바디 하나를 object 로 기록. material_index 는 생성자에 준 colors 의 인덱스.
+        triangle_materials 가 있으면 삼각형마다 그 colors 인덱스(p1)를 지정.
+        """
+        if len(facets) == 0:
+            return
+        object_id = len(self.object_ids) + 2  # 1 은 basematerials
+        self.object_ids.append(object_id)
+        self.write(f'<object id="{object_id}" name={quoteattr(name)} type="model" pid="1" pindex="{material_index}">\n'
+                   '<mesh>\n<vertices>\n')
+        # 고정 소수점: 수백 mm 보드에서도 메쉬 편차 수준(0.01 mm 이하)의 좌표를 유지
+        self.write("".join(f'<vertex x="{x:.6f}" y="{y:.6f}" z="{z:.6f}"/>\n'
+                           for x, y, z in np.asarray(points).tolist()))
+        self.write('</vertices>\n<triangles>\n')
+        if triangle_materials is None:
+            self.write("".join(f'<triangle v1="{v1}" v2="{v2}" v3="{v3}"/>\n'
+                               for v1, v2, v3 in np.asarray(facets).tolist()))
+        else:
+            self.write("".join(f'<triangle v1="{v1}" v2="{v2}" v3="{v3}" p1="{p1}"/>\n'
+                               for (v1, v2, v3), p1 in zip(np.asarray(facets).tolist(),
+                                                           np.asarray(triangle_materials).tolist())))
+        self.write('</triangles>\n</mesh>\n</object>\n')
+
+    def close(self):
+        self.write('</resources>\n<build>\n')
+        self.write("".join(f'<item objectid="{object_id}"/>\n' for object_id in self.object_ids))
+        self.write('</build>\n</model>\n')
+        self.model.close()
+        self.zip_file.close()
@@ -0,0 +1,196 @@
+'''
+ppt_freecad.txt 일괄 읽기와 도형별 스키마 검증.
+
+파일 전체를 한 번에 정규화(대괄호 안 쉼표 보호, 쉼표 -> 탭)한 뒤 줄별로 나누고,
+도형 종류별로 열(column) 배열을 만들어 스키마대로 검증합니다.
+검증 오류는 줄 번호와 함께 모두 모아서 반환하며, 오류가 있는 줄만 제외합니다.
+스키마보다 필드가 많은 줄은 기존 매크로처럼 뒤쪽 필드를 무시하고 경고만 기록합니다.
+FreeCAD 없이 동작하므로 단독으로 실행하여 파일을 검사할 수도 있습니다:
+
+    python ppt_freecad_reader.py ppt_freecad.txt
+'''
+import re
+import sys
+import argparse
+from collections import namedtuple
+
+import numpy as np
+
+# 모든 도형에 공통인 앞쪽 필드: 바디 타입, z 시작, z 크기, 도형 종류
+COMMON_FIELDS = ("body_type", "z_start", "depth", "shape_type")
+BODY_TYPES = ("P", "D", "N")
+
+# 도형별 스키마: (필수 필드, 선택 필드). 숫자 필드 이름은 NUMERIC_FIELDS 에 선언
+SHAPE_SCHEMAS = {
+    "RECTANGLE": (("center_x", "center_y", "x_size", "y_size", "angle", "color"), ("label",)),
+    "CIRCLE": (("center_x", "center_y", "radius", "color"), ("label",)),
+}
+NUMERIC_FIELDS = ("z_start", "depth", "center_x", "center_y", "x_size", "y_size", "angle", "radius")
+# 0 보다 커야 하는 필드
+POSITIVE_FIELDS = ("depth", "x_size", "y_size", "radius")
+
+# read_primitives 결과
+#   columns: {도형 종류: {필드 이름: 배열}} (숫자 필드는 float 배열, line_number 는 int 배열,
+#            body_type/label 은 문자열 배열, color 는 (n, 3) float 배열)
+#   errors : [(줄 번호, 메시지)] (줄 번호 순)
+#   warnings: [(줄 번호, 메시지)] (줄 번호 순, 해당 줄은 그대로 사용)
+PrimitiveTable = namedtuple("PrimitiveTable", ["columns", "errors", "warnings"])
+
+BRACKET_PATTERN = re.compile(r'\[[^\]]*\]')
+COLOR_NUMBER_PATTERN = re.compile(r'\d+')
+
+
+def normalize_text(text):
+    """
+    파일 전체 문자열에서 대괄호 안의 쉼표를 ':' 로 바꾸고 나머지 쉼표를 탭으로 바꿈.
+    """
+    text = BRACKET_PATTERN.sub(lambda match: match.group(0).replace(",", ":"), text)
+    return text.replace(",", "\t")
+
+
+def parse_color(color_str):
+    """
+    색상 문자열을 파싱하여 (R, G, B) 튜플을 반환. (0~1 범위)
+    """
+    if "ThemeColor" in color_str:
+        # ThemeColor를 특정 색상으로 매핑. 필요에 따라 변경 가능.
+        return (0.0, 1.0, 0.0)  # 녹색
+    numbers = COLOR_NUMBER_PATTERN.findall(color_str)
+    if len(numbers) >= 3:
+        return tuple(int(x) / 255.0 for x in numbers[:3])
+    else:
+        return (1.0, 1.0, 1.0)  # 기본 색상: 흰색
+
+
+def split_rows(text):
+    """
+    정규화된 파일 문자열을 도형 종류별 [(줄 번호, 필드 리스트)] 로 나눔.
+    빈 줄과 '#' 주석 줄은 건너뛰고, 공통 필드가 모자라거나 도형 종류를 모르면 오류로 기록.
+    줄은 "\n" 으로만 나눔 (splitlines 는 라벨 안의 PowerPoint 줄바꿈 \x0b 등에서도 나누어 줄 번호가 밀림).
+    """
+    rows = {shape_type: [] for shape_type in SHAPE_SCHEMAS}
+    errors = []
+    lines = normalize_text(text).split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    for line_number, line in enumerate(lines, 1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        fields = [field.strip() for field in line.split("\t")]
+        fields = [field for field in fields if field]
+        if len(fields) < len(COMMON_FIELDS):
+            errors.append((line_number, f"expected at least {len(COMMON_FIELDS)} fields, got {len(fields)}"))
+            continue
+        shape_type = fields[3].upper()
+        if shape_type not in rows:
+            errors.append((line_number, f"unknown shape type {fields[3]!r}"))
+            continue
+        rows[shape_type].append((line_number, fields))
+    return rows, errors
+
+
+def float_column(values, line_numbers, name, errors):
+    """
+    문자열 열을 float 배열로 변환. 변환할 수 없거나 유한하지 않은 값은 오류로 기록하고
+    (배열, 유효 마스크) 를 반환.
+    """
+    try:
+        column = np.array(values, dtype=float)
+    except ValueError:
+        # 느린 경로: 어느 줄이 잘못되었는지 찾기
+        column = np.empty(len(values))
+        for i, value in enumerate(values):
+            try:
+                column[i] = float(value)
+            except ValueError:
+                column[i] = np.nan
+    valid = np.isfinite(column)
+    for i in np.flatnonzero(~valid):
+        errors.append((int(line_numbers[i]), f"{name} must be a finite number, got {values[i]!r}"))
+    return column, valid
+
+
+def build_columns(shape_type, rows, errors, warnings):
+    """
+    한 도형 종류의 줄들을 스키마대로 검증하고 유효한 줄만 남긴 열 배열 딕셔너리를 반환.
+    필드가 스키마보다 많으면 뒤쪽 필드를 무시하고 warnings 에 기록.
+    """
+    required, optional = SHAPE_SCHEMAS[shape_type]
+    field_names = COMMON_FIELDS + required + optional
+    min_count = len(COMMON_FIELDS) + len(required)
+
+    line_numbers = np.array([line_number for line_number, _ in rows], dtype=int)
+    valid = np.ones(len(rows), dtype=bool)
+    for i, (line_number, fields) in enumerate(rows):
+        if len(fields) < min_count:
+            errors.append((line_number, f"{shape_type} expects {min_count} to {len(field_names)} fields, "
+                                        f"got {len(fields)}"))
+            valid[i] = False
+        elif len(fields) > len(field_names):
+            warnings.append((line_number, f"{shape_type} expects at most {len(field_names)} fields, "
+                                          f"got {len(fields)}; ignoring the extra fields"))
+    # 필드 수가 맞는 줄만 열로 펼침 (선택 필드가 없으면 빈 문자열, 남는 필드는 무시)
+    rows = [fields for (_, fields), ok in zip(rows, valid) if ok]
+    line_numbers = line_numbers[valid]
+    raw = {name: [fields[i] if i < len(fields) else "" for fields in rows]
+           for i, name in enumerate(field_names)}
+
+    valid = np.ones(len(rows), dtype=bool)
+    body_types = np.array([value.upper() for value in raw["body_type"]], dtype=str)
+    bad_body = ~np.isin(body_types, BODY_TYPES)
+    for i in np.flatnonzero(bad_body):
+        errors.append((int(line_numbers[i]), f"unknown body type {raw['body_type'][i]!r}"))
+    valid &= ~bad_body
+
+    columns = {"line_number": line_numbers, "body_type": body_types}
+    for name in field_names:
+        if name in NUMERIC_FIELDS:
+            column, ok = float_column(raw[name], line_numbers, name, errors)
+            if name in POSITIVE_FIELDS:
+                not_positive = ok & ~(column > 0)
+                for i in np.flatnonzero(not_positive):
+                    errors.append((int(line_numbers[i]), f"{name} must be greater than 0, got {raw[name][i]}"))
+                ok &= ~not_positive
+            columns[name] = column
+            valid &= ok
+    columns["color"] = np.array([parse_color(value) for value in raw["color"]], dtype=float).reshape(-1, 3)
+    columns["label"] = np.array([value.strip('"') for value in raw["label"]], dtype=str)
+
+    return {name: column[valid] for name, column in columns.items()}
+
+
+def read_primitives(input_file):
+    """
+    ppt_freecad.txt 를 읽어 PrimitiveTable(도형 종류별 열 배열, 검증 오류 목록, 경고 목록) 을 반환.
+    """
+    with open(input_file, "r", encoding="utf-8") as f:
+        text = f.read()
+    rows, errors = split_rows(text)
+    warnings = []
+    columns = {shape_type: build_columns(shape_type, shape_rows, errors, warnings)
+               for shape_type, shape_rows in rows.items()}
+    errors.sort()
+    warnings.sort()
+    return PrimitiveTable(columns, errors, warnings)
+
+
+def format_errors(errors):
+    return "\n".join(f"line {line_number}: {message}" for line_number, message in errors)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ppt_freecad.txt 스키마 검사")
+    parser.add_argument("input_file", help="검사할 ppt_freecad.txt 경로")
+    args = parser.parse_args()
+
+    table = read_primitives(args.input_file)
+    for shape_type, columns in table.columns.items():
+        print(f"{shape_type}: {len(columns['line_number'])} valid rows")
+    if table.warnings:
+        print(f"{len(table.warnings)} warnings:")
+        print(format_errors(table.warnings))
+    if table.errors:
+        print(f"{len(table.errors)} errors:")
+        print(format_errors(table.errors))
+        sys.exit(1)
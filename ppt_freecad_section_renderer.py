@@ -0,0 +1,176 @@
+'''
+ppt_freecad.txt 모델의 Z 단면 미리보기 (PNG/SVG, FreeCAD 불필요).
+
+각 Z 높이마다 [z_start, z_start + depth] 구간이 Z 를 포함하는 도형만 골라
+P, D 색상으로 칠하고 N 은 배경색으로 뚫어 그립니다.
+PNG 는 numpy 격자 래스터화 후 zlib 으로 직접 쓰므로 화면이나 추가 패키지가 필요 없습니다.
+도형별 래스터 마스크는 한 번만 계산하여 모든 단면에서 재사용합니다.
+
+    python ppt_freecad_section_renderer.py ppt_freecad.txt --z 0.5 1.5 3 --format png svg
+'''
+import os
+import math
+import time
+import zlib
+import struct
+import argparse
+
+import numpy as np
+
+from ppt_freecad_voxel_estimator import load_solids, rasterize
+from ppt_freecad_spatial import rect_corners
+
+INPUT_FILE = r"C:\tmp_freecad\ppt_freecad.txt"
+PIXEL_SIZE = 0.05  # PNG 픽셀 크기 (mm)
+MARGIN = 1.0  # 모델 BoundBox 바깥 여백 (mm)
+BACKGROUND_COLOR = (1.0, 1.0, 1.0)
+# 칠하는 순서: P 위에 D 를 그리고, N 은 마지막에 배경색으로 뚫음
+DRAW_ORDER = ("P", "D", "N")
+
+
+def section_extent(solids):
+    """
+    모든 단면이 같은 좌표를 쓰도록 전체 도형의 XY 범위(여백 포함)를 반환.
+    """
+    return (min(solid.box[0] for solid in solids) - MARGIN, max(solid.box[1] for solid in solids) + MARGIN,
+            min(solid.box[2] for solid in solids) - MARGIN, max(solid.box[3] for solid in solids) + MARGIN)
+
+
+def section_solids(solids, z):
+    """
+    z 높이 단면에 나타나는 도형을 그리는 순서(P, D, N, 같은 종류는 줄 번호 순)로 반환.
+    """
+    covering = [solid for solid in solids if solid.box[4] <= z <= solid.box[5]]
+    return [solid for body_type in DRAW_ORDER for solid in covering if solid.body_type == body_type]
+
+
+class SectionRaster:
+    """
+    고정된 XY 격자 위에 단면을 그림. 도형별 (창 범위, 마스크) 를 캐시하여 단면마다 재사용.
+    """
+
+    def __init__(self, extent, pixel_size):
+        x_min, x_max, y_min, y_max = extent
+        self.width = max(1, math.ceil((x_max - x_min) / pixel_size))
+        self.height = max(1, math.ceil((y_max - y_min) / pixel_size))
+        self.x_centers = x_min + (np.arange(self.width) + 0.5) * pixel_size
+        self.y_centers = y_min + (np.arange(self.height) + 0.5) * pixel_size
+        self.masks = {}
+
+    def window_mask(self, solid):
+        if solid.line_number not in self.masks:
+            box = solid.box
+            i0, i1 = np.searchsorted(self.x_centers, box[0], side="left"), np.searchsorted(self.x_centers, box[1], side="right")
+            j0, j1 = np.searchsorted(self.y_centers, box[2], side="left"), np.searchsorted(self.y_centers, box[3], side="right")
+            self.masks[solid.line_number] = (j0, j1, i0, i1,
+                                             rasterize(solid, self.x_centers[i0:i1], self.y_centers[j0:j1]))
+        return self.masks[solid.line_number]
+
+    def render(self, solids):
+        """
+        그리는 순서대로 정렬된 solids 를 칠한 (height, width, 3) uint8 이미지를 반환 (위쪽이 +Y).
+        """
+        image = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        image[:] = to_rgb8(BACKGROUND_COLOR)
+        for solid in solids:
+            j0, j1, i0, i1, mask = self.window_mask(solid)
+            color = BACKGROUND_COLOR if solid.body_type == "N" else solid.color
+            image[j0:j1, i0:i1][mask] = to_rgb8(color)
+        return image[::-1]
+
+
+def to_rgb8(color):
+    return np.array([min(255, max(0, int(round(channel * 255)))) for channel in color], dtype=np.uint8)
+
+
+def write_png(path, image):
+    """
+    (height, width, 3) uint8 이미지를 8비트 RGB PNG 로 저장.
+    """
+    height, width, _ = image.shape
+    # 각 행 앞에 필터 바이트 0 (None)
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), image.reshape(height, width * 3)], axis=1)
+
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)))
+        f.write(chunk(b"IEND", b""))
+
+
+def svg_color(color):
+    return "#" + "".join(f"{value:02X}" for value in to_rgb8(color))
+
+
+def svg_element(solid):
+    color = svg_color(BACKGROUND_COLOR if solid.body_type == "N" else solid.color)
+    if solid.shape_type == "CIRCLE":
+        cx, cy, radius = solid.params
+        return f'<circle cx="{cx:.4f}" cy="{cy:.4f}" r="{radius:.4f}" fill="{color}"/>'
+    points = " ".join(f"{x:.4f},{y:.4f}" for x, y in rect_corners(*solid.params))
+    return f'<polygon points="{points}" fill="{color}"/>'
+
+
+def write_svg(path, solids, extent, z):
+    """
+    단면을 SVG 로 저장. 모델 좌표(mm)를 그대로 쓰고 Y 축만 뒤집음.
+    """
+    x_min, x_max, y_min, y_max = extent
+    width, height = x_max - x_min, y_max - y_min
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{width:.4f}mm" height="{height:.4f}mm" '
+                f'viewBox="{x_min:.4f} {-y_max:.4f} {width:.4f} {height:.4f}">\n')
+        f.write(f'<title>z = {z}</title>\n')
+        f.write(f'<rect x="{x_min:.4f}" y="{-y_max:.4f}" width="{width:.4f}" height="{height:.4f}" '
+                f'fill="{svg_color(BACKGROUND_COLOR)}"/>\n')
+        f.write('<g transform="scale(1,-1)">\n')
+        for solid in solids:
+            f.write(svg_element(solid) + "\n")
+        f.write('</g>\n</svg>\n')
+
+
+def render_sections(input_file, z_values, output_dir, formats=("png",), pixel_size=PIXEL_SIZE):
+    """
+    z_values 마다 단면 파일을 output_dir 에 "<입력 이름>_z<z>.<형식>" 으로 저장하고 경로 리스트를 반환.
+    """
+    solids = load_solids(input_file)
+    if not solids:
+        return []
+    extent = section_extent(solids)
+    raster = SectionRaster(extent, pixel_size) if "png" in formats else None
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    os.makedirs(output_dir, exist_ok=True)
+
+    paths = []
+    for z in z_values:
+        drawn = section_solids(solids, z)
+        stem = os.path.join(output_dir, f"{base_name}_z{z:g}")
+        if raster:
+            write_png(stem + ".png", raster.render(drawn))
+            paths.append(stem + ".png")
+        if "svg" in formats:
+            write_svg(stem + ".svg", drawn, extent, z)
+            paths.append(stem + ".svg")
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ppt_freecad.txt Z 단면 PNG/SVG 렌더링 (FreeCAD 불필요)")
+    parser.add_argument("input_file", nargs="?", default=INPUT_FILE, help="ppt_freecad.txt 경로")
+    parser.add_argument("--z", type=float, nargs="+", required=True, help="단면 Z 높이들 (mm)")
+    parser.add_argument("--format", nargs="+", choices=("png", "svg"), default=["png"], help="출력 형식")
+    parser.add_argument("--pixel", type=float, default=PIXEL_SIZE, help="PNG 픽셀 크기 (mm)")
+    parser.add_argument("--output-dir", default=".", help="출력 폴더")
+    args = parser.parse_args()
+    if args.pixel <= 0:
+        parser.error("--pixel must be greater than 0")
+
+    start = time.perf_counter()
+    paths = render_sections(args.input_file, args.z, args.output_dir, args.format, args.pixel)
+    elapsed = time.perf_counter() - start
+    for path in paths:
+        print(f"Saved {path}")
+    print(f"Rendered {len(args.z)} sections in {elapsed * 1000:.1f} ms")
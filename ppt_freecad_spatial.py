@@ -0,0 +1,138 @@
+'''
+ppt_freecad.txt 프리미티브용 2.5D 공간 인덱스.
+
+FreeCAD 없이 동작하며, 추출기(sub_PPT_to_Freecad_macro_data.py)가
+N 프리미티브와 D/P 프리미티브의 겹침 맵을 만들 때, freecad_macro.py 가
+겹치는 바디끼리만 boolean 연산을 묶을 때 사용합니다.
+박스는 모두 (x_min, x_max, y_min, y_max, z_min, z_max) 튜플입니다.
+'''
+import math
+from collections import defaultdict
+
+
+def rotated_rect_box(center_x, center_y, x_size, y_size, angle, z_start, depth):
+    """
+    회전된 사각형의 XY 외접 박스와 z 구간을 반환.
+    """
+    rad = math.radians(angle)
+    cos_a = abs(math.cos(rad))
+    sin_a = abs(math.sin(rad))
+    half_x = (x_size * cos_a + y_size * sin_a) / 2
+    half_y = (x_size * sin_a + y_size * cos_a) / 2
+    return (center_x - half_x, center_x + half_x,
+            center_y - half_y, center_y + half_y,
+            z_start, z_start + depth)
+
+
+def rect_corners(center_x, center_y, x_size, y_size, angle):
+    """
+    중심 기준 angle 도 회전된 사각형의 꼭짓점 4개를 반시계 방향 [(x, y)] 로 반환.
+    """
+    rad = math.radians(angle)
+    cos_a, sin_a = math.cos(rad), math.sin(rad)
+    corners = [(sx * x_size / 2, sy * y_size / 2) for sx, sy in ((-1, -1), (1, -1), (1, 1), (-1, 1))]
+    return [(center_x + u * cos_a - v * sin_a, center_y + u * sin_a + v * cos_a) for u, v in corners]
+
+
+def circle_box(center_x, center_y, radius, z_start, height):
+    """
+    원기둥의 XY 외접 박스와 z 구간을 반환.
+    """
+    return (center_x - radius, center_x + radius,
+            center_y - radius, center_y + radius,
+            z_start, z_start + height)
+
+
+def boxes_overlap(box1, box2):
+    """
+    두 박스가 XY 와 z 구간 모두에서 겹치면 True (경계 접촉 포함).
+    """
+    return (box1[0] <= box2[1] and box1[1] >= box2[0] and
+            box1[2] <= box2[3] and box1[3] >= box2[2] and
+            box1[4] <= box2[5] and box1[5] >= box2[4])
+
+
+def suggest_cell_size(boxes):
+    """
+    박스들의 XY 크기 중앙값을 격자 셀 크기로 제안.
+    """
+    extents = sorted(max(box[1] - box[0], box[3] - box[2]) for box in boxes)
+    if not extents:
+        return 1.0
+    cell_size = extents[len(extents) // 2]
+    return cell_size if cell_size > 0 else 1.0
+
+
+class UniformGrid:
+    """
+    XY 균일 격자 인덱스. 각 셀에 걸친 박스의 키를 보관하고,
+    질의 시 후보를 모은 뒤 z 구간까지 포함한 박스 겹침으로 최종 판정합니다.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)
+        self.boxes = {}
+
+    def _cell_range(self, box):
+        size = self.cell_size
+        return (range(math.floor(box[0] / size), math.floor(box[1] / size) + 1),
+                range(math.floor(box[2] / size), math.floor(box[3] / size) + 1))
+
+    def insert(self, key, box):
+        self.boxes[key] = box
+        x_range, y_range = self._cell_range(box)
+        for ix in x_range:
+            for iy in y_range:
+                self.cells[(ix, iy)].append(key)
+
+    def query(self, box):
+        """
+        box 와 겹치는 모든 키를 정렬된 리스트로 반환.
+        """
+        candidates = set()
+        x_range, y_range = self._cell_range(box)
+        for ix in x_range:
+            for iy in y_range:
+                candidates.update(self.cells.get((ix, iy), ()))
+        return sorted(key for key in candidates if boxes_overlap(self.boxes[key], box))
+
+
+def sweep_and_prune_pairs(boxes):
+    """
+    x_min 기준으로 정렬한 뒤 x 구간이 열려 있는 박스끼리만 비교하여,
+    겹치는 박스 인덱스 쌍 (i, j), i < j 를 생성합니다.
+    """
+    order = sorted(range(len(boxes)), key=lambda index: boxes[index][0])
+    active = []
+    for index in order:
+        box = boxes[index]
+        active = [other for other in active if boxes[other][1] >= box[0]]
+        for other in active:
+            if boxes_overlap(boxes[other], box):
+                yield (other, index) if other < index else (index, other)
+        active.append(index)
+
+
+def overlap_components(boxes):
+    """
+    박스 겹침으로 연결된 그룹을 union-find 로 묶어 인덱스 리스트들로 반환.
+    각 그룹과 그룹 내 인덱스는 오름차순입니다.
+    """
+    parent = list(range(len(boxes)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    for i, j in sweep_and_prune_pairs(boxes):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    groups = defaultdict(list)
+    for index in range(len(boxes)):
+        groups[find(index)].append(index)
+    return list(groups.values())
@@ -0,0 +1,196 @@
+'''
+ppt_freecad.txt 의 P/D 바디 부피, 질량 중심, BoundBox 추정 (FreeCAD 불필요).
+
+FreeCAD 의 boolean 없이 사각형(회전 포함)과 원기둥을 격자에 래스터화하여
+P 합집합 - N 과 각 D - N 을 boolean 배열 연산으로 계산합니다.
+모든 도형은 z 방향 돌출이므로 z 는 도형 경계에서만 나누고(정확), XY 만 VOXEL_SIZE 격자로 나눕니다.
+
+    python ppt_freecad_voxel_estimator.py ppt_freecad.txt --voxel 0.05 --density 1.85
+'''
+import sys
+import json
+import math
+import time
+import argparse
+from collections import namedtuple
+
+import numpy as np
+
+from ppt_freecad_reader import read_primitives
+from ppt_freecad_spatial import rotated_rect_box, circle_box, boxes_overlap
+
+INPUT_FILE = r"C:\tmp_freecad\ppt_freecad.txt"
+VOXEL_SIZE = 0.1  # XY 격자 크기 (mm)
+FILL_ROWS = 256  # fill 이 한 번에 래스터화하는 y 행 수 (래스터화 중 임시 float 배열 크기 제한)
+
+# 래스터화할 도형: params 는 RECTANGLE (center_x, center_y, x_size, y_size, angle), CIRCLE (center_x, center_y, radius)
+Solid = namedtuple("Solid", ["body_type", "line_number", "shape_type", "params", "box", "color"])
+
+
+def load_solids(input_file):
+    """
+    ppt_freecad.txt 를 읽어 Solid 리스트를 줄 번호 순으로 반환. 검증 오류가 있는 줄은 제외.
+    """
+    table = read_primitives(input_file)
+    if table.errors:
+        print(f"{len(table.errors)} invalid lines skipped (see ppt_freecad_reader.py).")
+    solids = []
+    rect = table.columns["RECTANGLE"]
+    for line_number, body_type, cx, cy, x_size, y_size, angle, z_start, depth, color in zip(
+            rect["line_number"].tolist(), rect["body_type"].tolist(), rect["center_x"].tolist(),
+            rect["center_y"].tolist(), rect["x_size"].tolist(), rect["y_size"].tolist(),
+            rect["angle"].tolist(), rect["z_start"].tolist(), rect["depth"].tolist(), rect["color"].tolist()):
+        solids.append(Solid(body_type, line_number, "RECTANGLE", (cx, cy, x_size, y_size, angle),
+                            rotated_rect_box(cx, cy, x_size, y_size, angle, z_start, depth), tuple(color)))
+    circle = table.columns["CIRCLE"]
+    for line_number, body_type, cx, cy, radius, z_start, depth, color in zip(
+            circle["line_number"].tolist(), circle["body_type"].tolist(), circle["center_x"].tolist(),
+            circle["center_y"].tolist(), circle["radius"].tolist(), circle["z_start"].tolist(),
+            circle["depth"].tolist(), circle["color"].tolist()):
+        solids.append(Solid(body_type, line_number, "CIRCLE", (cx, cy, radius),
+                            circle_box(cx, cy, radius, z_start, depth), tuple(color)))
+    solids.sort(key=lambda solid: solid.line_number)
+    return solids
+
+
+def rasterize(solid, x_centers, y_centers):
+    """
+    격자 셀 중심 (x_centers, y_centers) 중 solid 의 XY 단면 안에 있는 셀의 2D 마스크 (y, x) 를 반환.
+    """
+    dx = x_centers[np.newaxis, :] - solid.params[0]
+    dy = y_centers[:, np.newaxis] - solid.params[1]
+    if solid.shape_type == "CIRCLE":
+        radius = solid.params[2]
+        return dx * dx + dy * dy <= radius * radius
+    _, _, x_size, y_size, angle = solid.params
+    # 셀 중심을 사각형의 로컬 좌표로 되돌림 (FreeCAD 에서는 중심 기준 +angle 도 회전)
+    rad = math.radians(angle)
+    cos_a, sin_a = math.cos(rad), math.sin(rad)
+    u = dx * cos_a + dy * sin_a
+    v = -dx * sin_a + dy * cos_a
+    return (np.abs(u) <= x_size / 2) & (np.abs(v) <= y_size / 2)
+
+
+def fill(grid, solid, x_centers, y_centers, z_mid, value=True):
+    """
+    solid 가 차지하는 셀을 grid (z 층, y, x) 에 채움 (value 가 False 면 비움).
+    solid 의 BoundBox 구간만 FILL_ROWS 행씩 나누어 계산.
+    """
+    box = solid.box
+    i0, i1 = np.searchsorted(x_centers, box[0], side="left"), np.searchsorted(x_centers, box[1], side="right")
+    j0, j1 = np.searchsorted(y_centers, box[2], side="left"), np.searchsorted(y_centers, box[3], side="right")
+    layers = np.flatnonzero((z_mid > box[4]) & (z_mid < box[5]))
+    if i0 >= i1 or j0 >= j1 or not len(layers):
+        return
+    for row in range(j0, j1, FILL_ROWS):
+        row_end = min(j1, row + FILL_ROWS)
+        mask = rasterize(solid, x_centers[i0:i1], y_centers[row:row_end])
+        if value:
+            grid[layers[0]:layers[-1] + 1, row:row_end, i0:i1] |= mask
+        else:
+            grid[layers[0]:layers[-1] + 1, row:row_end, i0:i1] &= ~mask
+
+
+def evaluate(positive, negative, voxel_size):
+    """
+    positive 들의 합집합에서 negative 들을 뺀 영역의 부피, 질량 중심, BoundBox 를 dict 로 반환.
+    z 는 도형 경계로 나눈 층, XY 는 voxel_size 격자.
+    """
+    x_min = min(solid.box[0] for solid in positive)
+    x_max = max(solid.box[1] for solid in positive)
+    y_min = min(solid.box[2] for solid in positive)
+    y_max = max(solid.box[3] for solid in positive)
+    z_min = min(solid.box[4] for solid in positive)
+    z_max = max(solid.box[5] for solid in positive)
+    region = (x_min, x_max, y_min, y_max, z_min, z_max)
+    negative = [solid for solid in negative if boxes_overlap(solid.box, region)]
+
+    nx = max(1, math.ceil((x_max - x_min) / voxel_size))
+    ny = max(1, math.ceil((y_max - y_min) / voxel_size))
+    x_centers = x_min + (np.arange(nx) + 0.5) * voxel_size
+    y_centers = y_min + (np.arange(ny) + 0.5) * voxel_size
+    z_breaks = np.unique(np.clip([z for solid in positive + negative for z in solid.box[4:6]], z_min, z_max))
+    z_mid = (z_breaks[:-1] + z_breaks[1:]) / 2
+    dz = np.diff(z_breaks)
+
+    # 격자는 bool 하나만 사용: P 를 채운 뒤 N 을 그 자리에서 비움
+    material = np.zeros((len(dz), ny, nx), dtype=bool)
+    for solid in positive:
+        fill(material, solid, x_centers, y_centers, z_mid)
+    for solid in negative:
+        fill(material, solid, x_centers, y_centers, z_mid, value=False)
+
+    # 셀 부피 = voxel_size^2 * dz (층마다 다름). 층별 셀 개수 (z, x), (z, y) 에 dz 를 곱해
+    # 축별 질량 분포를 구하므로 float 3D 격자를 만들지 않음
+    counts_zx = material.sum(axis=1)
+    counts_zy = material.sum(axis=2)
+    mass_x = dz @ counts_zx
+    mass_y = dz @ counts_zy
+    mass_z = counts_zx.sum(axis=1) * dz
+    total = mass_z.sum()
+    volume = total * voxel_size ** 2
+    result = {"volume": float(volume), "center_of_mass": None, "bound_box": None, "cells": int(counts_zx.sum())}
+    if volume == 0:
+        return result
+    result["center_of_mass"] = [float(mass_x @ x_centers / total), float(mass_y @ y_centers / total),
+                                float(mass_z @ z_mid / total)]
+
+    occupied_x = np.flatnonzero(mass_x)
+    occupied_y = np.flatnonzero(mass_y)
+    occupied_z = np.flatnonzero(mass_z)
+    result["bound_box"] = [float(x_min + occupied_x[0] * voxel_size), float(x_min + (occupied_x[-1] + 1) * voxel_size),
+                           float(y_min + occupied_y[0] * voxel_size), float(y_min + (occupied_y[-1] + 1) * voxel_size),
+                           float(z_breaks[occupied_z[0]]), float(z_breaks[occupied_z[-1] + 1])]
+    return result
+
+
+def estimate(input_file, voxel_size=VOXEL_SIZE):
+    """
+    P 합집합 - N ("P_SUM") 과 각 D - N ("D line <줄 번호>") 의 추정 결과 리스트를 반환.
+    """
+    solids = load_solids(input_file)
+    P_solids = [solid for solid in solids if solid.body_type == "P"]
+    N_solids = [solid for solid in solids if solid.body_type == "N"]
+    results = []
+    if P_solids:
+        results.append(dict(name="P_SUM", lines=[solid.line_number for solid in P_solids],
+                            **evaluate(P_solids, N_solids, voxel_size)))
+    for solid in solids:
+        if solid.body_type == "D":
+            results.append(dict(name=f"D line {solid.line_number}", lines=[solid.line_number],
+                                **evaluate([solid], N_solids, voxel_size)))
+    return results
+
+
+def print_results(results, density=None):
+    for result in results:
+        line = f"{result['name']:14s} volume {result['volume']:12.4f} mm^3"
+        if density:
+            line += f", mass {result['volume'] * density / 1000:10.4f} g"
+        if result["center_of_mass"]:
+            line += ", CoM ({:.3f}, {:.3f}, {:.3f})".format(*result["center_of_mass"])
+            line += ", BoundBox x[{:.3f}, {:.3f}] y[{:.3f}, {:.3f}] z[{:.3f}, {:.3f}]".format(*result["bound_box"])
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ppt_freecad.txt P/D 바디 부피와 질량 중심 추정 (FreeCAD 불필요)")
+    parser.add_argument("input_file", nargs="?", default=INPUT_FILE, help="ppt_freecad.txt 경로")
+    parser.add_argument("--voxel", type=float, default=VOXEL_SIZE, help="XY 격자 크기 (mm)")
+    parser.add_argument("--density", type=float, help="밀도 (g/cm^3). 지정하면 질량도 출력")
+    parser.add_argument("--json", help="결과를 JSON 으로 저장할 경로")
+    args = parser.parse_args()
+    if args.voxel <= 0:
+        parser.error("--voxel must be greater than 0")
+
+    start = time.perf_counter()
+    results = estimate(args.input_file, args.voxel)
+    elapsed = time.perf_counter() - start
+    print_results(results, args.density)
+    print(f"Estimated {len(results)} bodies in {elapsed * 1000:.1f} ms (voxel {args.voxel} mm)")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"voxel_size": args.voxel, "density": args.density, "bodies": results}, f, indent=2)
+        print(f"Saved {args.json}")
+    if not results:
+        sys.exit(1)
@@ -8,11 +8,19 @@ import time
 import os
 import sys
 import re
+import io
+import json
+import hashlib
+import argparse
 from pptx import Presentation
 from pptx.enum.shapes import MSO_SHAPE_TYPE, MSO_AUTO_SHAPE_TYPE
 from pptx.enum.dml import MSO_FILL
 from pptx.dml.color import RGBColor, MSO_THEME_COLOR
 import logging
+from ppt_freecad_spatial import rotated_rect_box, circle_box, suggest_cell_size, UniformGrid
+
+# 겹침 맵 파일은 출력 txt 와 같은 위치에 "<이름>_overlap.json" 으로 저장 (freecad_macro.py 와 동일 규칙)
+OVERLAP_MAP_SUFFIX = "_overlap.json"
 
 logger = logging.getLogger(__name__)
 
@@ -348,7 +356,120 @@ def validate_and_adjust_z_property(z_property_original, z_base):
 
 
 
-def save_shapes_to_txt(prs, output_file="c:\\tmp_freecad\\ppt_freecad.txt"):
+class LineCountingWriter:
+    """
+    쓰여진 줄 수를 세는 파일 래퍼. 데이터 줄의 줄 번호(1부터)를 매크로와 맞추는 데 사용.
+    """
+    def __init__(self, f):
+        self.f = f
+        self.line_count = 0
+
+    def write(self, text):
+        self.line_count += text.count("\n")
+        return self.f.write(text)
+
+
+def primitive_box(line):
+    """
+    modify_data 로 변환된 데이터 줄에서 (바디 타입, 2.5D 박스)를 반환. 해석할 수 없으면 None.
+    """
+    fields = line.split("\t")
+    try:
+        body_type = fields[0].upper()
+        z_start = float(fields[1])
+        depth = float(fields[2])
+        if fields[3] == 'RECTANGLE':
+            box = rotated_rect_box(float(fields[4]), float(fields[5]), float(fields[6]),
+                                   float(fields[7]), float(fields[8]), z_start, depth)
+        elif fields[3] == 'CIRCLE':
+            box = circle_box(float(fields[4]), float(fields[5]), float(fields[6]), z_start, depth)
+        else:
+            return None
+    except (ValueError, IndexError):
+        return None
+    return body_type, box
+
+
+def build_overlap_map(primitives):
+    """
+    N 프리미티브를 균일 격자에 넣고, 각 D/P 프리미티브와 겹치는 N 프리미티브의 줄 번호를 찾습니다.
+
+    :param primitives: (줄 번호, 변환된 데이터 줄) 리스트
+    :return: {D/P 줄 번호: [N 줄 번호, ...]} (겹치는 N 이 없어도 빈 리스트로 포함)
+    """
+    n_boxes = {}
+    target_boxes = {}
+    for line_number, line in primitives:
+        parsed = primitive_box(line)
+        if parsed is None:
+            continue
+        body_type, box = parsed
+        if body_type == "N":
+            n_boxes[line_number] = box
+        elif body_type in ("P", "D"):
+            target_boxes[line_number] = box
+
+    grid = UniformGrid(suggest_cell_size(n_boxes.values()))
+    for line_number, box in n_boxes.items():
+        grid.insert(line_number, box)
+
+    return {line_number: grid.query(box) for line_number, box in target_boxes.items()}
+
+
+def save_overlap_map(output_file, overlaps):
+    """
+    겹침 맵을 JSON 으로 저장. txt 파일의 sha1 을 함께 기록하여 매크로가 오래된 맵을 무시할 수 있게 합니다.
+    """
+    with open(output_file, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+
+    map_file = os.path.splitext(output_file)[0] + OVERLAP_MAP_SUFFIX
+    with open(map_file, "w", encoding="utf-8") as f:
+        json.dump({
+            "source": os.path.basename(output_file),
+            "sha1": digest,
+            "overlaps": {str(line_number): n_lines for line_number, n_lines in overlaps.items()},
+        }, f, indent=1)
+
+    pair_count = sum(len(n_lines) for n_lines in overlaps.values())
+    logger.info(f"겹침 맵 저장: {map_file} (D/P {len(overlaps)}개, N 겹침 {pair_count}쌍)")
+    return map_file
+
+
+def new_slide_report(slide_index, z_base):
+    """
+    dry-run 리포트의 슬라이드별 통계 항목을 생성.
+    """
+    return {
+        "slide": slide_index + 1,
+        "z_base": z_base,
+        "accepted": 0,
+        "ignored": 0,
+        "invalid": 0,
+        "bodies": {"P": 0, "D": 0, "N": 0},
+        "rejections": [],
+    }
+
+
+def record_rejection(slide_report, status, shape_name, reason, detail=""):
+    """
+    무시(ignored) 또는 무효(invalid) 도형을 슬라이드 통계에 기록.
+    """
+    if slide_report is None:
+        return
+    slide_report[status] += 1
+    slide_report["rejections"].append({"shape": shape_name, "status": status, "reason": reason, "detail": detail})
+
+
+def save_shapes_to_txt(prs, output_file="c:\\tmp_freecad\\ppt_freecad.txt", dry_run=False, report=None):
+    """
+    슬라이드의 도형 정보를 FreeCAD 매크로 입력 txt 와 겹침 맵으로 저장합니다.
+
+    :param dry_run: True 이면 파싱/검증만 수행하고 어떤 파일도 쓰지 않음
+    :param report: dict 를 넘기면 슬라이드별 통계, 단계별 시간, 예상 솔리드 수를 채워 넣음
+    """
+    timings = {}
+    phase_start = time.perf_counter()
     slide_width = prs.slide_width
     slide_height = prs.slide_height
     slides = list(prs.slides)
@@ -360,7 +481,14 @@ def save_shapes_to_txt(prs, output_file="c:\\tmp_freecad\\ppt_freecad.txt"):
     
     x_min, y_min = find_min_coordinates(first_slide.shapes, slide_height)
 
-    with open(output_file, "w", encoding="utf-8") as f:
+    primitives = []  # (줄 번호, 변환된 데이터 줄)
+    slide_reports = []
+    format_time = 0.0
+
+    # dry-run 에서는 메모리 버퍼에 써서 줄 번호만 유지하고 파일은 만들지 않음
+    raw_output = io.StringIO() if dry_run else open(output_file, "w", encoding="utf-8")
+    with raw_output as raw_file:
+        f = LineCountingWriter(raw_file)
         for slide_index, slide in enumerate(slides):
             contains_freecad = any(
                 shape.has_text_frame and "@freecad" in shape.text_frame.text.lower()
@@ -371,9 +499,12 @@ def save_shapes_to_txt(prs, output_file="c:\\tmp_freecad\\ppt_freecad.txt"):
                 message = f"# 슬라이드 {slide_index + 1}에 '@freecad' 없음. 종료합니다."
                 logger.info(message)
                 f.write(message + "\n")
-                return output_file  # 반환값 추가
+                break
 
             z_base = extract_z_base(slide)
+            slide_report = new_slide_report(slide_index, z_base) if report is not None else None
+            if slide_report is not None:
+                slide_reports.append(slide_report)
             header = f"# 슬라이드 {slide_index + 1} (z_base={z_base}, scale={scale})"
             logger.info(header)
             f.write(header + "\n")
@@ -388,6 +519,7 @@ def save_shapes_to_txt(prs, output_file="c:\\tmp_freecad\\ppt_freecad.txt"):
                         message = f"# 실선이 아닌 도형 무시: {shape.name}"
                         logger.info(message)
                         f.write(message + "\n")
+                        record_rejection(slide_report, "ignored", shape.name, "non_solid_line")
                         continue
 
                     if shape.shape_type == MSO_SHAPE_TYPE.AUTO_SHAPE and shape.auto_shape_type in [MSO_AUTO_SHAPE_TYPE.RECTANGLE, MSO_AUTO_SHAPE_TYPE.OVAL]:
@@ -409,6 +541,7 @@ def save_shapes_to_txt(prs, output_file="c:\\tmp_freecad\\ppt_freecad.txt"):
                             message = "      # 경고: z_property 값이 없어서 무시합니다."
                             logger.warning(message)
                             f.write(message + "\n")
+                            record_rejection(slide_report, "ignored", shape.name, "missing_z_property")
                             continue
 
                         z_property_original = shape.text_frame.text.strip().upper()
@@ -420,6 +553,7 @@ def save_shapes_to_txt(prs, output_file="c:\\tmp_freecad\\ppt_freecad.txt"):
                             message = f"      # 경고: 유효하지 않은 z_property 값: {z_property_original}"
                             logger.warning(message)
                             f.write(message + "\n")
+                            record_rejection(slide_report, "invalid", shape.name, "invalid_z_property", z_property_original)
                             continue
 
                         # validate_and_adjust_z_property에서 반환된 z_property를 사용
@@ -428,43 +562,116 @@ def save_shapes_to_txt(prs, output_file="c:\\tmp_freecad\\ppt_freecad.txt"):
                             p_shapes.append(result_line)
                         else:
                             other_shapes.append(result_line)
-
-                        
+                    else:
+                        record_rejection(slide_report, "ignored", shape.name, "unsupported_shape", str(shape.shape_type))
 
                 except Exception as e:
                     logger.error(f"도형 처리 중 오류 발생: {e}")
                     f.write(f"# 도형 처리 중 오류 발생: {e}\n")
+                    record_rejection(slide_report, "invalid", getattr(shape, "name", ""), "error", str(e))
 
             # 헤더 작성
             f.write("# P/N\tz0\tz_size\tRECTANGLE\tx_center\ty_center\tx_size\ty_size\tangle\tcolor\n")
             f.write("# P/N\tz0\tz_size\tCIRCLE\tx_center\ty_center\tradius\tcolor\n")
 
             # 결과 정렬 및 작성
+            format_start = time.perf_counter()
             result_lines.extend(sorted(p_shapes))
             result_lines.extend(sorted(other_shapes))
             for line in result_lines:
                 line = modify_data(line, scale)
+                if slide_report is not None:
+                    parsed = primitive_box(line)
+                    if parsed is None:
+                        record_rejection(slide_report, "invalid", "", "malformed_output_line", line)
+                    else:
+                        slide_report["accepted"] += 1
+                        slide_report["bodies"][parsed[0]] = slide_report["bodies"].get(parsed[0], 0) + 1
+                primitives.append((f.line_count + 1, line))
                 f.write(line + "\n")
+            format_time += time.perf_counter() - format_start
+
+    timings["extract"] = time.perf_counter() - phase_start - format_time
+    timings["format"] = format_time
+
+    phase_start = time.perf_counter()
+    overlaps = build_overlap_map(primitives)
+    if not dry_run:
+        save_overlap_map(output_file, overlaps)
+    timings["overlap_map"] = time.perf_counter() - phase_start
 
+    if report is not None:
+        fill_report(report, slide_reports, timings, overlaps)
     return output_file
 
 
+def fill_report(report, slide_reports, timings, overlaps):
+    """
+    dry-run 리포트에 슬라이드별 통계와 합계, 예상 솔리드 수를 채웁니다.
+    매크로는 P 바디 전체를 하나의 P_SUM 으로, D 바디는 각각 하나의 솔리드로 만듭니다.
+    """
+    totals = {"accepted": 0, "ignored": 0, "invalid": 0, "bodies": {"P": 0, "D": 0, "N": 0}}
+    for slide_report in slide_reports:
+        for key in ("accepted", "ignored", "invalid"):
+            totals[key] += slide_report[key]
+        for body_type, count in slide_report["bodies"].items():
+            totals["bodies"][body_type] = totals["bodies"].get(body_type, 0) + count
+
+    report["slides"] = slide_reports
+    report["totals"] = totals
+    report["timings"] = dict(report.get("timings", {}), **timings)
+    report["overlap_pairs"] = sum(len(n_lines) for n_lines in overlaps.values())
+    report["expected_solids"] = (1 if totals["bodies"]["P"] else 0) + totals["bodies"]["D"]
 
-def main(ppt_file):
+
+
+def main(ppt_file, output_file="c:\\tmp_freecad\\ppt_freecad.txt", dry_run=False, report_file=None):
+    """
+    PPTX 를 읽어 매크로 입력 txt 를 저장합니다.
+    dry_run 이면 파일을 쓰지 않고, report_file 이 있으면 진단 리포트(JSON)만 저장합니다.
+    유효하지 않은 도형 수를 반환합니다 (입력 파일 오류 시 None).
+    """
     if not os.path.exists(ppt_file) or not ppt_file.endswith(".pptx"):
         logger.error("오류: 유효한 PPTX 파일을 입력하세요.")
-        return
+        return None
 
+    report = {"input": ppt_file, "dry_run": dry_run} if report_file or dry_run else None
+
+    load_start = time.perf_counter()
     prs = Presentation(ppt_file)  # PPT 파일 열기
-    output_file = save_shapes_to_txt(prs)  # 도형 정보를 추출하고 파일 저장
+    if report is not None:
+        report["timings"] = {"load": time.perf_counter() - load_start}
+
+    output_file = save_shapes_to_txt(prs, output_file, dry_run=dry_run, report=report)  # 도형 정보를 추출하고 파일 저장
+    invalid_count = report["totals"]["invalid"] if report is not None else 0
+
+    if report_file:
+        with open(report_file, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1, ensure_ascii=False)
+        logger.info(f"진단 리포트 저장: {report_file}")
 
-    input(f"\n>> Freecad 매크로 파일 입력 자료를 {output_file}에 저장하였습니다.")
+    if dry_run:
+        totals = report["totals"]
+        logger.info(f"dry-run 완료: 채택 {totals['accepted']}, 무시 {totals['ignored']}, "
+                    f"무효 {totals['invalid']}, 예상 솔리드 {report['expected_solids']}개")
+    else:
+        input(f"\n>> Freecad 매크로 파일 입력 자료를 {output_file}에 저장하였습니다.")
+    return invalid_count
 
 
 if __name__ == "__main__":
-    ppt_file = "c:\\tmp_freecad\\tmp.pptx"  # 입력 파일 경로 고정
+    parser = argparse.ArgumentParser(description="PPT 도형을 FreeCAD 매크로 입력 txt 로 변환")
+    parser.add_argument("ppt_file", nargs="?", default="c:\\tmp_freecad\\tmp.pptx", help="입력 PPTX (기본값: c:\\tmp_freecad\\tmp.pptx)")
+    parser.add_argument("--output", default="c:\\tmp_freecad\\ppt_freecad.txt", help="출력 txt 경로")
+    parser.add_argument("--dry-run", action="store_true", help="파싱/검증만 수행하고 파일을 쓰지 않음")
+    parser.add_argument("--report", help="슬라이드별 진단 리포트 JSON 경로")
+    args = parser.parse_args()
+
+    ppt_file = args.ppt_file
     if not os.path.exists(ppt_file):
         logger.error(f"오류: 파일이 존재하지 않습니다: {ppt_file}")
         sys.exit(1)  # 실행 종료
-    main(ppt_file)
+    invalid_count = main(ppt_file, args.output, dry_run=args.dry_run, report_file=args.report)
+    if invalid_count is None or (args.dry_run and invalid_count > 0):
+        sys.exit(1)
     
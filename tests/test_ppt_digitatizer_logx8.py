@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pptx")
+pytest.importorskip("scipy")
+
+from pptx import Presentation
+from pptx.util import Emu
+from pptx.enum.shapes import MSO_SHAPE
+
+from ppt_digitatizer_logx8 import AxisTransform, extract_correction_range, find_plot_regions
+
+E = 10000
+
+
+def add_rectangle(slide, left, top, width, height):
+    return slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, Emu(left * E), Emu(top * E), Emu(width * E), Emu(height * E))
+
+
+def add_text(slide, left, top, text):
+    box = slide.shapes.add_textbox(Emu(left * E), Emu(top * E), Emu(40 * E), Emu(40 * E))
+    box.text_frame.text = text
+    return box
+
+
+def make_slide():
+    prs = Presentation()
+    return prs, prs.slides.add_slide(prs.slide_layouts[6])
+
+
+def test_each_range_box_pairs_with_one_rectangle(capsys):
+    prs, slide = make_slide()
+    add_rectangle(slide, 0, 100, 200, 200)
+    add_rectangle(slide, 250, 100, 600, 200)
+    add_rectangle(slide, 900, 100, 50, 50)  # 범례 테두리: 짝이 되는 보정 범위 없음
+    # 오른쪽 그래프 안의 문자 상자는 왼쪽 그래프 중심에 더 가깝지만 자신을 포함하는 사각형과 짝지음
+    add_text(slide, 260, 110, "x_min=10\nx_max=20\ny_min=0\ny_max=1")
+    add_text(slide, 0, 320, "x_min=1\nx_max=2\ny_min=0\ny_max=1")
+
+    regions = find_plot_regions(slide, 1, prs.slide_height)
+
+    assert [region.index for region in regions] == [0, 1]
+    assert [region.left for region in regions] == [0, 250 * E]
+    assert regions[0].x_axis.limits() == pytest.approx((1, 2))
+    assert regions[1].x_axis.limits() == pytest.approx((10, 20))
+    assert "건너뜁니다" in capsys.readouterr().out
+
+
+def test_single_rectangle_without_range_box_uses_default():
+    prs, slide = make_slide()
+    add_rectangle(slide, 0, 100, 200, 200)
+
+    regions = find_plot_regions(slide, 1, prs.slide_height)
+
+    assert len(regions) == 1
+    assert regions[0].x_axis.scale == "log10"
+    assert regions[0].x_axis.limits() == pytest.approx((1000, 30000))
+
+
+def range_box(text):
+    return SimpleNamespace(text_frame=SimpleNamespace(text=text))
+
+
+@pytest.mark.parametrize("scale", sorted(AxisTransform.SCALES))
+def test_declared_scale_maps_rectangle_edges(scale):
+    box = range_box(f"x_min=1\nx_max=10\ny_min=0\ny_max=1\nx_scale={scale}")
+    x_axis, y_axis = extract_correction_range(box, 100, 200, 400, 300)
+
+    assert x_axis.scale == scale
+    assert x_axis.limits() == pytest.approx((1, 10))
+    assert x_axis.to_data([100, 500]) == pytest.approx([1, 10])
+    assert x_axis.to_slide([1, 10]) == pytest.approx([100, 500])
+    assert y_axis.to_data([200, 500]) == pytest.approx([0, 1])
+
+
+@pytest.mark.parametrize("scale", sorted(set(AxisTransform.SCALES) - {"linear"}))
+def test_scale_function_in_expression(scale):
+    box = range_box(f"x_min={scale}(2)\nx_max={scale}(8)\ny_min=0\ny_max=1")
+    x_axis, _ = extract_correction_range(box, 0, 0, 1, 1)
+
+    assert x_axis.scale == scale
+    assert x_axis.limits() == pytest.approx((2, 8))
+    assert x_axis.to_data([0.5]) == pytest.approx(x_axis.inverse([(x_axis.low + x_axis.high) / 2]))
+
+
+@pytest.mark.parametrize("scale", sorted(AxisTransform.SCALES))
+def test_reversed_range_is_rejected(scale):
+    box = range_box(f"x_min=10\nx_max=1\ny_min=0\ny_max=1\nx_scale={scale}")
+    assert extract_correction_range(box, 0, 0, 1, 1) == (None, None)
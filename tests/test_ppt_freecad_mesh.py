@@ -0,0 +1,20 @@
+import zipfile
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from ppt_freecad_mesh import ThreeMFWriter
+
+NAMESPACE = {"m": "http://schemas.microsoft.com/3dmanufacturing/core/2015/02"}
+
+
+def test_3mf_escapes_names_and_keeps_vertex_precision(tmp_path):
+    path = tmp_path / "model.3mf"
+    writer = ThreeMFWriter(str(path), [(1.0, 0.0, 0.0)])
+    writer.add(np.array([[512.34567, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]),
+               np.array([[0, 1, 2]]), 0, 'D & <"1">')
+    writer.close()
+
+    root = ET.fromstring(zipfile.ZipFile(path).read("3D/3dmodel.model"))
+    assert root.find(".//m:object", NAMESPACE).get("name") == 'D & <"1">'
+    assert float(root.find(".//m:vertex", NAMESPACE).get("x")) == 512.34567
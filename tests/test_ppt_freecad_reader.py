@@ -0,0 +1,38 @@
+from ppt_freecad_reader import read_primitives, split_rows
+
+
+def test_soft_line_break_in_label_keeps_line_numbers(tmp_path):
+    # PowerPoint 텍스트 상자의 줄바꿈(Shift+Enter)은 라벨 안에 \x0b 로 들어옴
+    text = ("# header\n"
+            "P\t0\t2\tRECTANGLE\t10\t10\t20\t20\t0\t(200:200:200)\tfirst\x0bsecond\n"
+            "D\t0\t1\tCIRCLE\t5\t5\t2\t(255:0:0)\n")
+    rows, errors = split_rows(text)
+    assert errors == []
+    assert [line_number for line_number, _ in rows["RECTANGLE"]] == [2]
+    assert rows["RECTANGLE"][0][1][-1] == "first\x0bsecond"
+    assert [line_number for line_number, _ in rows["CIRCLE"]] == [3]
+
+    path = tmp_path / "ppt_freecad.txt"
+    path.write_text(text, encoding="utf-8")
+    table = read_primitives(str(path))
+    assert table.errors == []
+    assert table.columns["RECTANGLE"]["label"].tolist() == ["first\x0bsecond"]
+    assert table.columns["CIRCLE"]["line_number"].tolist() == [3]
+
+
+def test_crlf_and_missing_final_newline():
+    rows, errors = split_rows("# header\r\nP\t0\t2\tCIRCLE\t5\t5\t2\t(255:0:0)")
+    assert errors == []
+    assert [line_number for line_number, _ in rows["CIRCLE"]] == [2]
+
+
+def test_extra_trailing_fields_are_ignored_with_a_warning(tmp_path):
+    path = tmp_path / "ppt_freecad.txt"
+    path.write_text("P\t0\t2\tRECTANGLE\t10\t10\t20\t20\t0\t(200:200:200)\tU1\textra\n"
+                    "N\t0\t1\tCIRCLE\t5\t5\t2\t(0:0:0)\tH1\tmore\tfields\n", encoding="utf-8")
+    table = read_primitives(str(path))
+
+    assert table.errors == []
+    assert [line_number for line_number, _ in table.warnings] == [1, 2]
+    assert table.columns["RECTANGLE"]["label"].tolist() == ["U1"]
+    assert table.columns["CIRCLE"]["radius"].tolist() == [2.0]